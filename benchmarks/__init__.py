@@ -0,0 +1,2 @@
+# This file makes the benchmarks directory a Python package
+# Run with: python -m benchmarks.run
@@ -0,0 +1,500 @@
+"""
+In-memory stand-ins used by the benchmarks: a Motor-like collection and a
+Pyrogram-like client with configurable per-call latency.
+"""
+import asyncio
+import copy
+import itertools
+from collections import Counter
+from types import SimpleNamespace
+from pyrogram.enums import ChatMemberStatus, MessageMediaType
+from pyrogram.errors import UserNotParticipant
+
+
+# ---------------------------------------------------------------- MongoDB ---
+
+def _get(doc, key):
+    for part in key.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return None
+        doc = doc[part]
+    return doc
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        value = _get(doc, key)
+        if isinstance(cond, dict) and any(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$nin" and value in arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$exists" and (value is not None) != arg:
+                    return False
+                if op in ("$gt", "$gte", "$lt", "$lte"):
+                    if value is None:
+                        return False
+                    if op == "$gt" and not value > arg:
+                        return False
+                    if op == "$gte" and not value >= arg:
+                        return False
+                    if op == "$lt" and not value < arg:
+                        return False
+                    if op == "$lte" and not value <= arg:
+                        return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _set(doc, key, value):
+    parts = key.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _apply_update(doc, update, inserting=False):
+    for key, value in update.get("$set", {}).items():
+        _set(doc, key, value)
+    if inserting:
+        for key, value in update.get("$setOnInsert", {}).items():
+            _set(doc, key, value)
+    for key, value in update.get("$inc", {}).items():
+        _set(doc, key, (_get(doc, key) or 0) + value)
+    for key, value in update.get("$push", {}).items():
+        items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+        _set(doc, key, (_get(doc, key) or []) + list(items))
+    for key, value in update.get("$addToSet", {}).items():
+        current = _get(doc, key) or []
+        items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+        _set(doc, key, current + [item for item in items if item not in current])
+    for key, value in update.get("$pull", {}).items():
+        _set(doc, key, [item for item in _get(doc, key) or [] if item != value])
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v}
+    if include:
+        result = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: copy.deepcopy(v) for k, v in doc.items() if k not in projection}
+
+
+class FakeResult(SimpleNamespace):
+    pass
+
+
+class FakeCursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = []
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key, direction=1):
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def _results(self):
+        await self._collection._latency()
+        docs = [doc for doc in self._collection._docs.values() if _matches(doc, self._query)]
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda d: (_get(d, key) is None, _get(d, key)), reverse=direction < 0)
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length=None):
+        docs = await self._results()
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iter is None:
+            self._iter = iter(await self._results())
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _FakeAggregate(FakeCursor):
+    def __init__(self, collection, pipeline):
+        super().__init__(collection, None, None)
+        self._pipeline = pipeline
+
+    async def _results(self):
+        await self._collection._latency()
+        docs = list(self._collection._docs.values())
+        for stage in self._pipeline:
+            if "$match" in stage:
+                docs = [doc for doc in docs if _matches(doc, stage["$match"])]
+            elif "$group" in stage:
+                spec = dict(stage["$group"])
+                key = spec.pop("_id")
+                groups = {}
+                for doc in docs:
+                    group_key = _get(doc, key[1:]) if isinstance(key, str) else key
+                    group = groups.setdefault(group_key, {"_id": group_key, **{field: 0 for field in spec}})
+                    for field, op in spec.items():
+                        value = op["$sum"]
+                        value = _get(doc, value[1:]) if isinstance(value, str) else value
+                        group[field] += value if isinstance(value, (int, float)) else 0
+                docs = list(groups.values())
+        return docs
+
+
+class FakeCollection:
+    """Subset of AsyncIOMotorCollection used by database.py"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, latency=0.0):
+        self.name = name
+        self.latency = latency
+        self.calls = Counter()
+        self._docs = {}
+        self._indexes = {"_id_": {"key": [("_id", 1)]}}
+
+    async def _latency(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def find(self, query=None, projection=None):
+        self.calls["find"] += 1
+        return FakeCursor(self, query, projection)
+
+    async def find_one(self, query=None, projection=None):
+        self.calls["find_one"] += 1
+        docs = await FakeCursor(self, query, projection).limit(1).to_list()
+        return docs[0] if docs else None
+
+    async def insert_one(self, doc):
+        self.calls["insert_one"] += 1
+        await self._latency()
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", next(self._ids))
+        if doc["_id"] in self._docs:
+            raise ValueError(f"duplicate key {doc['_id']} in {self.name}")
+        self._docs[doc["_id"]] = doc
+        return FakeResult(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls["insert_many"] += 1
+        ids = []
+        for doc in docs:
+            ids.append((await self.insert_one(doc)).inserted_id)
+        return FakeResult(inserted_ids=ids)
+
+    def _update(self, query, update, upsert):
+        matched = [doc for doc in self._docs.values() if _matches(doc, query)]
+        if matched:
+            _apply_update(matched[0], update)
+            return matched[0], 1, None
+        if upsert:
+            doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+            doc.setdefault("_id", next(self._ids))
+            _apply_update(doc, update, inserting=True)
+            self._docs[doc["_id"]] = doc
+            return doc, 0, doc["_id"]
+        return None, 0, None
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls["update_one"] += 1
+        await self._latency()
+        _, matched, upserted_id = self._update(query, update, upsert)
+        return FakeResult(matched_count=matched, modified_count=matched, upserted_id=upserted_id)
+
+    async def update_many(self, query, update, upsert=False):
+        self.calls["update_many"] += 1
+        await self._latency()
+        matched = [doc for doc in self._docs.values() if _matches(doc, query)]
+        for doc in matched:
+            _apply_update(doc, update)
+        return FakeResult(matched_count=len(matched), modified_count=len(matched))
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False, projection=None):
+        self.calls["find_one_and_update"] += 1
+        await self._latency()
+        before = next((copy.deepcopy(d) for d in self._docs.values() if _matches(d, query)), None)
+        doc, _, _ = self._update(query, update, upsert)
+        return _project(doc, projection) if return_document and doc else before
+
+    async def bulk_write(self, requests, ordered=True):
+        self.calls["bulk_write"] += 1
+        await self._latency()
+        matched = inserted = 0
+        upserted_ids = {}
+        for index, request in enumerate(requests):
+            name = type(request).__name__
+            if name == "InsertOne":
+                self._docs.setdefault(request._doc.get("_id", next(self._ids)), copy.deepcopy(request._doc))
+                inserted += 1
+                continue
+            _, m, upserted_id = self._update(request._filter, request._doc, request._upsert)
+            matched += m
+            if upserted_id is not None:
+                upserted_ids[index] = upserted_id
+        return FakeResult(matched_count=matched, upserted_count=len(upserted_ids),
+                          upserted_ids=upserted_ids, inserted_count=inserted)
+
+    async def delete_one(self, query):
+        self.calls["delete_one"] += 1
+        await self._latency()
+        for key, doc in list(self._docs.items()):
+            if _matches(doc, query):
+                del self._docs[key]
+                return FakeResult(deleted_count=1)
+        return FakeResult(deleted_count=0)
+
+    async def find_one_and_delete(self, query, projection=None):
+        self.calls["find_one_and_delete"] += 1
+        await self._latency()
+        for key, doc in list(self._docs.items()):
+            if _matches(doc, query):
+                del self._docs[key]
+                return _project(doc, projection)
+        return None
+
+    def aggregate(self, pipeline):
+        """Supports $match and a single $group with {"$sum": 1} / {"$sum": "$field"}"""
+        self.calls["aggregate"] += 1
+        return _FakeAggregate(self, pipeline)
+
+    async def delete_many(self, query):
+        self.calls["delete_many"] += 1
+        await self._latency()
+        keys = [key for key, doc in self._docs.items() if _matches(doc, query)]
+        for key in keys:
+            del self._docs[key]
+        return FakeResult(deleted_count=len(keys))
+
+    async def count_documents(self, query):
+        self.calls["count_documents"] += 1
+        await self._latency()
+        return sum(1 for doc in self._docs.values() if _matches(doc, query))
+
+    async def estimated_document_count(self):
+        self.calls["estimated_document_count"] += 1
+        await self._latency()
+        return len(self._docs)
+
+    async def create_index(self, keys, **kwargs):
+        keys = [(keys, 1)] if isinstance(keys, str) else keys
+        name = kwargs.get("name") or "_".join(f"{k}_{d}" for k, d in keys)
+        self._indexes[name] = {"key": keys}
+        return name
+
+    async def create_indexes(self, indexes):
+        for index in indexes:
+            self._indexes[index.document["name"]] = {"key": list(index.document["key"].items())}
+        return [index.document["name"] for index in indexes]
+
+    async def index_information(self):
+        return dict(self._indexes)
+
+    def watch(self, *args, **kwargs):
+        from pymongo.errors import OperationFailure
+        raise OperationFailure("change streams are not supported by the fake", code=40573)
+
+
+def install_fake_db(db, latency=0.0):
+    """Replace every Motor collection on the Database object with an in-memory one"""
+    import motor.motor_asyncio
+    for name, value in list(vars(db).items()):
+        if isinstance(value, (motor.motor_asyncio.AsyncIOMotorCollection, FakeCollection)):
+            setattr(db, name, FakeCollection(value.name, latency))
+    return db
+
+
+# --------------------------------------------------------------- Telegram ---
+
+class FakeCaption(str):
+    @property
+    def html(self):
+        return str(self)
+
+
+class FakeUser(SimpleNamespace):
+    def __init__(self, user_id):
+        super().__init__(
+            id=user_id,
+            first_name=f"User{user_id}",
+            last_name=None,
+            username=f"user{user_id}",
+            mention=f"User{user_id}"
+        )
+
+
+class FakeMessage:
+    """Message with the attributes and bound methods the plugins use"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, client, chat_id, message_id=None, text=None, document=None,
+                 caption=None, from_user=None, media_group_id=None):
+        self._client = client
+        self.id = message_id or next(self._ids)
+        self.chat = SimpleNamespace(id=chat_id)
+        self.text = text
+        self.caption = FakeCaption(caption) if caption else None
+        self.document = document
+        self.media = MessageMediaType.DOCUMENT if document else None
+        self.media_group_id = media_group_id
+        self.from_user = from_user
+        self.reply_markup = None
+        self.empty = False
+        self.forward_from_chat = None
+        self.forward_from_message_id = None
+        self.reply_to_message = None
+        self.command = text.split() if text and text.startswith("/") else None
+
+    async def copy(self, chat_id, **kwargs):
+        return await self._client.copy_message(chat_id, self.chat.id, self.id, **kwargs)
+
+    async def forward(self, chat_id, **kwargs):
+        return await self._client.forward_messages(chat_id, self.chat.id, self.id, **kwargs)
+
+    async def reply_text(self, text, **kwargs):
+        return await self._client.send_message(self.chat.id, text, **kwargs)
+
+    async def reply_photo(self, photo, **kwargs):
+        return await self._client.send_message(self.chat.id, kwargs.get("caption", ""))
+
+    async def edit_text(self, text, **kwargs):
+        return await self._client.edit_message_text(self.chat.id, self.id, text, **kwargs)
+
+    async def delete(self):
+        return await self._client.delete_messages(self.chat.id, self.id)
+
+
+class FakeClient:
+    """
+    Pyrogram Client stand-in.
+
+    Every API method sleeps `latency` seconds and is counted in `calls`.
+    Channel posts are kept in `channels[chat_id][message_id]`.
+    """
+
+    def __init__(self, latency=0.0, channel_id=-100, members=None):
+        self.latency = latency
+        self.name = "BenchBot"
+        self.username = "BenchBot"
+        self.me = SimpleNamespace(id=1, username=self.username)
+        self.db_channel = SimpleNamespace(id=channel_id, title="DB")
+        self.movie_channel = None
+        self.calls = Counter()
+        self.channels = {}
+        self.sent = Counter()
+        # channel_id -> set of member user IDs (None means everybody is a member)
+        self.members = members
+
+    async def _api(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def add_post(self, chat_id, message_id, file_name="file.mkv", caption="caption", media_group_id=None):
+        document = SimpleNamespace(
+            file_id=f"FILE{chat_id}_{message_id}",
+            file_unique_id=f"U{chat_id}_{message_id}",
+            file_name=file_name,
+            file_size=1024 * 1024
+        )
+        message = FakeMessage(self, chat_id, message_id, document=document, caption=caption,
+                              media_group_id=media_group_id)
+        self.channels.setdefault(chat_id, {})[message_id] = message
+        return message
+
+    def user_message(self, user_id, text):
+        return FakeMessage(self, user_id, text=text, from_user=FakeUser(user_id))
+
+    def _post(self, chat_id, message_id):
+        message = self.channels.get(chat_id, {}).get(message_id)
+        if message is None:
+            message = FakeMessage(self, chat_id, message_id)
+            message.empty = True
+        return message
+
+    async def get_messages(self, chat_id, message_ids):
+        await self._api("get_messages")
+        if isinstance(message_ids, int):
+            return self._post(chat_id, message_ids)
+        return [self._post(chat_id, message_id) for message_id in message_ids]
+
+    async def get_media_group(self, chat_id, message_id):
+        await self._api("get_media_group")
+        message = self._post(chat_id, message_id)
+        return [m for m in self.channels.get(chat_id, {}).values()
+                if m.media_group_id and m.media_group_id == message.media_group_id]
+
+    async def _deliver(self, chat_id):
+        self.sent[chat_id] += 1
+        return FakeMessage(self, chat_id)
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self._api("copy_message")
+        return await self._deliver(chat_id)
+
+    async def copy_media_group(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self._api("copy_media_group")
+        group = await self.get_media_group(from_chat_id, message_id)
+        return [await self._deliver(chat_id) for _ in group]
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        await self._api("send_media_group")
+        return [await self._deliver(chat_id) for _ in media]
+
+    async def forward_messages(self, chat_id, from_chat_id, message_ids, **kwargs):
+        await self._api("forward_messages")
+        if isinstance(message_ids, int):
+            return await self._deliver(chat_id)
+        return [await self._deliver(chat_id) for _ in message_ids]
+
+    async def send_cached_media(self, chat_id, file_id, **kwargs):
+        await self._api("send_cached_media")
+        return await self._deliver(chat_id)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self._api("send_message")
+        return await self._deliver(chat_id)
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        await self._api("edit_message_text")
+
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        await self._api("delete_messages")
+        return True
+
+    async def get_chat_member(self, chat_id, user_id):
+        await self._api("get_chat_member")
+        if self.members is not None and user_id not in self.members.get(chat_id, ()):
+            raise UserNotParticipant()
+        return SimpleNamespace(status=ChatMemberStatus.MEMBER)
+
+    async def get_chat(self, chat_id):
+        await self._api("get_chat")
+        return SimpleNamespace(id=chat_id, title=f"Channel {chat_id}", invite_link=f"https://t.me/+{abs(chat_id)}")
+
+    async def export_chat_invite_link(self, chat_id):
+        await self._api("export_chat_invite_link")
+        return f"https://t.me/+new{abs(chat_id)}"
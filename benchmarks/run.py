@@ -0,0 +1,349 @@
+"""
+Offline benchmarks for the delivery, ingest and broadcast paths.
+
+Runs the real plugin handlers against FakeClient and an in-memory MongoDB,
+so no network access or credentials are needed.
+
+Usage:
+    python -m benchmarks.run --out bench.json
+    python -m benchmarks.run --latency 0.05 --db-latency 0.005 --baseline bench.json
+
+Send rate limits are lifted by default so results reflect the code path;
+set GLOBAL_SEND_RATE / CHAT_SEND_RATE in the environment to include them.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017")
+os.environ.setdefault("CHANNEL_ID", "-1001000000001")
+for _key in ("GLOBAL_SEND_RATE", "CHAT_SEND_RATE", "GROUP_SEND_RATE", "CHAT_SEND_BURST"):
+    os.environ.setdefault(_key, "1000000")
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+from config import CHANNEL_ID, DATABASE_URL, DATABASE_NAME
+from database.database import db
+import helper_func
+from helper_func import encode, decode, get_media_info
+from core.channels import channel_info
+from core.broadcast import broadcaster
+from core.sender import sender, TokenBucket
+from plugins.start import start_command, recent_taps
+from plugins.channel_post import handle_short_channel_post
+from core.ingest import ingest
+from benchmarks.fakes import FakeClient, install_fake_db
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+async def reset(args, members=None):
+    """Fresh in-memory database and caches; returns a new fake client"""
+    db.__init__(DATABASE_URL, DATABASE_NAME)
+    install_fake_db(db, args.db_latency)
+    helper_func.membership_cache.clear()
+    recent_taps.clear()
+    channel_info.__init__(channel_info.refresh_interval)
+    return FakeClient(latency=args.latency, channel_id=CHANNEL_ID, members=members)
+
+
+async def add_files(client, count, start=1, step=1):
+    message_ids = []
+    for message_id in range(start, start + count * step, step):
+        post = client.add_post(CHANNEL_ID, message_id)
+        await db.add_file(message_id, message_id, category="short", media=get_media_info(post))
+        message_ids.append(message_id)
+    return message_ids
+
+
+async def bench_start_single(args):
+    """/start <file> requests from distinct users, args.concurrency at a time"""
+    client = await reset(args)
+    file_ids = await add_files(client, args.files)
+    messages = [
+        client.user_message(100000 + i, f"/start {encode(str(file_ids[i % len(file_ids)]))}")
+        for i in range(args.requests)
+    ]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run(message):
+        async with semaphore:
+            await start_command(client, message)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(message) for message in messages))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": args.requests,
+        "seconds": elapsed,
+        "requests_per_sec": args.requests / elapsed,
+        "api_calls_per_request": sum(client.calls.values()) / args.requests,
+        "db_ops_per_request": sum(sum(c.calls.values()) for c in _collections()) / args.requests
+    }
+
+
+async def bench_surge(args):
+    """args.requests users opening the same link at once, for a file only known by message ID"""
+    client = await reset(args)
+    client.add_post(CHANNEL_ID, 1)
+    await db.add_file(1, 1, category="short")
+    messages = [client.user_message(100000 + i, f"/start {encode('1')}") for i in range(args.requests)]
+    # Every user taps twice
+    messages += messages
+
+    started = time.perf_counter()
+    await asyncio.gather(*(start_command(client, message) for message in messages))
+    elapsed = time.perf_counter() - started
+    return {
+        "clicks": len(messages),
+        "seconds": elapsed,
+        "deliveries": sum(client.sent.values()),
+        "get_messages": client.calls["get_messages"],
+        "file_queries": db.files.calls["find_one"] + db.files.calls["update_one"]
+    }
+
+
+async def bench_batch(args):
+    """One batch link over a range where every other ID is a non-file post"""
+    client = await reset(args)
+    file_ids = await add_files(client, args.batch_size, step=2)
+    message = client.user_message(5, f"/start {encode(f'{file_ids[0]}-{file_ids[-1]}')}")
+
+    started = time.perf_counter()
+    await start_command(client, message)
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(file_ids),
+        "seconds": elapsed,
+        "files_per_sec": client.sent[5] / elapsed,
+        "api_calls": sum(client.calls.values())
+    }
+
+
+async def bench_batch_manifest(args):
+    """The same files as bench_batch, through a stored batch manifest link"""
+    client = await reset(args)
+    file_ids = await add_files(client, args.batch_size, step=2)
+    batch_id = await db.create_batch(CHANNEL_ID, file_ids, 1)
+    message = client.user_message(5, f"/start {encode(f'batch:{batch_id}')}")
+
+    started = time.perf_counter()
+    await start_command(client, message)
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(file_ids),
+        "seconds": elapsed,
+        "files_per_sec": client.sent[5] / elapsed,
+        "api_calls": sum(client.calls.values()),
+        "db_ops": sum(sum(c.calls.values()) for c in _collections())
+    }
+
+
+async def bench_batch_albums(args):
+    """A batch manifest of args.batch_size files posted as 10-file albums"""
+    client = await reset(args)
+    file_ids = list(range(1, args.batch_size + 1))
+    for message_id in file_ids:
+        post = client.add_post(CHANNEL_ID, message_id, media_group_id=f"album{(message_id - 1) // 10}")
+        await db.add_file(message_id, message_id, category="short", media=get_media_info(post))
+    batch_id = await db.create_batch(CHANNEL_ID, file_ids, 1)
+    message = client.user_message(5, f"/start {encode(f'batch:{batch_id}')}")
+
+    started = time.perf_counter()
+    await start_command(client, message)
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(file_ids),
+        "seconds": elapsed,
+        "files_per_sec": client.sent[5] / elapsed,
+        "api_calls": sum(client.calls.values())
+    }
+
+
+async def bench_ingest(args):
+    """args.batch_size posts forwarded into the SHORT channel at once"""
+    client = await reset(args)
+    posts = [client.add_post(CHANNEL_ID, message_id) for message_id in range(1, args.batch_size + 1)]
+
+    started = time.perf_counter()
+    for post in posts:
+        await handle_short_channel_post(client, post)
+    await ingest.stop()
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(posts),
+        "seconds": elapsed,
+        "api_calls": sum(client.calls.values()),
+        "db_ops": sum(sum(c.calls.values()) for c in _collections())
+    }
+
+
+async def bench_broadcast(args):
+    """Copy broadcast to args.users users"""
+    client = await reset(args)
+    for user_id in range(1, args.users + 1):
+        await db.users.insert_one({"_id": user_id})
+    source = client.add_post(CHANNEL_ID, 1)
+    status = client.user_message(1, "status")
+
+    started = time.perf_counter()
+    job_id = await broadcaster.start_job(client, "copy", source, 1, status)
+    await broadcaster._tasks[job_id]
+    elapsed = time.perf_counter() - started
+    sends = client.calls["copy_message"]
+    return {"users": args.users, "seconds": elapsed, "sends_per_sec": sends / elapsed}
+
+
+async def bench_contention(args):
+    """Single-file requests while a broadcast saturates a 50 msg/s global budget"""
+    client = await reset(args)
+    for user_id in range(1, args.users + 1):
+        await db.users.insert_one({"_id": user_id})
+    file_ids = await add_files(client, 10)
+    source = client.add_post(CHANNEL_ID, 1000)
+    status = client.user_message(1, "status")
+    unlimited = sender._global
+    sender._global = TokenBucket(50, 1)
+    try:
+        job_id = await broadcaster.start_job(client, "copy", source, 1, status)
+        await asyncio.sleep(0.2)
+        latencies = []
+        for i in range(10):
+            message = client.user_message(200000 + i, f"/start {encode(str(file_ids[i]))}")
+            started = time.perf_counter()
+            await start_command(client, message)
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+        await broadcaster.cancel()
+        task = broadcaster._tasks.get(job_id)
+        if task:
+            await task
+    finally:
+        sender._global = unlimited
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "max_ms": latencies[-1] * 1000
+    }
+
+
+async def bench_micro(args):
+    """encode / decode / is_subscribed cost"""
+    number = 100000
+    encode_s = timeit.timeit(lambda: encode("1234567-1234667"), number=number)
+    payload = encode("1234567-1234667")
+    decode_s = timeit.timeit(lambda: decode(payload), number=number)
+
+    channels = [-1002000000001, -1002000000002, -1002000000003, -1002000000004]
+    client = await reset(args)
+    await db.set_setting("force_sub_channels", channels)
+    iterations = args.subscribe_checks
+
+    started = time.perf_counter()
+    for user_id in range(iterations):
+        await helper_func.is_subscribed(client, user_id)
+    uncached = (time.perf_counter() - started) / iterations
+
+    started = time.perf_counter()
+    for user_id in range(iterations):
+        await helper_func.is_subscribed(client, user_id)
+    cached = (time.perf_counter() - started) / iterations
+
+    return {
+        "encode_per_sec": number / encode_s,
+        "decode_per_sec": number / decode_s,
+        "is_subscribed_uncached_ms": uncached * 1000,
+        "is_subscribed_cached_ms": cached * 1000
+    }
+
+
+def _collections():
+    from benchmarks.fakes import FakeCollection
+    return [value for value in vars(db).values() if isinstance(value, FakeCollection)]
+
+
+BENCHMARKS = {
+    "start_single": bench_start_single,
+    "surge": bench_surge,
+    "batch": bench_batch,
+    "batch_manifest": bench_batch_manifest,
+    "batch_albums": bench_batch_albums,
+    "ingest": bench_ingest,
+    "broadcast": bench_broadcast,
+    "contention": bench_contention,
+    "micro": bench_micro,
+}
+
+
+def compare(results, baseline):
+    """Print relative change of every numeric metric against a baseline run"""
+    print(f"\n{'benchmark':<14}{'metric':<30}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, metrics in results["results"].items():
+        for metric, value in metrics.items():
+            old = baseline.get("results", {}).get(name, {}).get(metric)
+            if not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old * 100
+            print(f"{name:<14}{metric:<30}{old:>14.3f}{value:>14.3f}{change:>+9.1f}%")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+async def main(args):
+    selected = args.only or list(BENCHMARKS)
+    results = {}
+    for name in selected:
+        results[name] = await BENCHMARKS[name](args)
+        print(f"{name}: " + ", ".join(
+            f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in results[name].items()
+        ))
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")}
+        },
+        "results": results
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per Telegram API call")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="seconds per MongoDB operation")
+    parser.add_argument("--requests", type=int, default=1000, help="/start requests for start_single")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent /start requests (bot workers)")
+    parser.add_argument("--files", type=int, default=200, help="distinct files requested in start_single")
+    parser.add_argument("--batch-size", type=int, default=50, help="files in the batch benchmark")
+    parser.add_argument("--users", type=int, default=2000, help="users in the broadcast benchmark")
+    parser.add_argument("--subscribe-checks", type=int, default=200, help="is_subscribed calls per measurement")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    sys.exit(0)
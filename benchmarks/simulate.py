@@ -0,0 +1,508 @@
+"""
+Telegram API simulator: the real plugin handlers under Telegram's limits.
+
+SimulatedClient extends FakeClient with the server side of the Bot API:
+flood control per chat and per bot (sliding windows; FloodWait with the
+remaining wait), users who blocked the bot or deleted their account
+(UserIsBlocked / InputUserDeactivated) and long-tailed API latency.
+
+Every scenario also runs with --force-sub channels (a --members share of
+the requesters has joined; the others join and tap "Try Again") and the
+auto-delete loop, so membership checks and deletions are part of the
+traffic.
+
+Scenarios:
+    viral     one link posted in a big group: --clicks users open it within
+              --burst seconds, some of them tapping twice
+    overlap   /broadcast to --users users while /start traffic keeps coming
+              in at --rate requests per second
+    replay    file requests and broadcasts at the times recorded in --log
+              (log.txt and its rotated backups, plain or LOG_JSON format)
+
+Usage:
+    python -m benchmarks.simulate
+    python -m benchmarks.simulate --scenario replay --log log.txt log.txt.1 --speed 10
+
+Unlike benchmarks.run, the bot's own send limits (GLOBAL_SEND_RATE,
+CHAT_SEND_RATE, ...) keep their configured values: they are part of what
+is measured.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017")
+os.environ.setdefault("CHANNEL_ID", "-1001000000001")
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import re
+import sys
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from pyrogram.errors import FloodWait, UserIsBlocked, InputUserDeactivated
+from config import CHANNEL_ID, DATABASE_URL, DATABASE_NAME
+from database.database import db
+import helper_func
+from helper_func import encode, get_media_info, RETRY_PREFIX
+from core.channels import channel_info
+from core.broadcast import broadcaster
+from core.auto_delete import auto_delete
+from core.sender import sending
+from plugins.start import start_command, recent_taps
+from plugins.broadcast import broadcast_command
+from benchmarks.fakes import FakeClient, FakeCollection, install_fake_db
+
+logging.getLogger().setLevel(logging.WARNING)
+
+# Sigma of the lognormal factor applied to --latency (p99 is about 3x the median)
+LATENCY_SIGMA = 0.5
+# User ID ranges: broadcast audience, synthetic requesters, the admin
+AUDIENCE_BASE = 1000000
+REQUESTER_BASE = 2000000
+ADMIN_ID = 1
+# IDs of the simulated force-sub channels
+FORCE_SUB_BASE = -1002000000000
+# Seconds allowed for the auto-delete loop to catch up once the traffic is over
+DRAIN_TIMEOUT = 60
+
+# Log records the traffic is rebuilt from (see plugins/start.py, plugins/broadcast.py)
+LOG_LINE = re.compile(r"^\[(?P<time>[^\]]+?) - (?P<level>\w+)\] - (?P<logger>\S+) - (?P<message>.*)$")
+LOG_TIME_FORMATS = ("%d-%b-%y %H:%M:%S", "%Y-%m-%d %H:%M:%S,%f")
+FILE_SENT = re.compile(r"File (\d+) sent to user (\d+) \(category: (\w+)\)")
+REPEATED_TAP = re.compile(r"Ignoring repeated tap by (\d+) on \('file', (\d+)\)")
+NOT_LOGGED = re.compile(r"\(\+(\d+) similar not logged\)")
+BROADCAST_STARTED = re.compile(r"(?:Forward b|B)roadcast \S+ started by admin")
+
+
+class SlidingWindow:
+    """At most `limit` events in any `window` seconds"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.times = deque()
+
+    def wait(self, now):
+        """Seconds until one more event fits"""
+        while self.times and now - self.times[0] >= self.window:
+            self.times.popleft()
+        if len(self.times) < self.limit:
+            return 0
+        return self.times[0] + self.window - now
+
+    def add(self, now):
+        self.times.append(now)
+
+
+class SimulatedClient(FakeClient):
+    """
+    FakeClient with Telegram's flood control and unreachable users.
+
+    Every outgoing call (send, copy, forward, album, edit, delete) counts
+    once against the bot-wide window and once against the target chat's
+    window (private chats and groups/channels have different limits). A
+    rejected call costs a round trip. Like bot.py, the client surfaces every
+    FloodWait of a Sender call and sleeps through waits of up to
+    `sleep_threshold` seconds on anything else.
+    """
+
+    def __init__(self, latency=0.0, channel_id=-100, global_limit=(30, 1), private_limit=(20, 10),
+                 group_limit=(20, 60), sleep_threshold=5, blocked=(), deactivated=(), seed=0):
+        super().__init__(latency, channel_id)
+        self.global_limit = global_limit
+        self.private_limit = private_limit
+        self.group_limit = group_limit
+        self.sleep_threshold = sleep_threshold
+        self.blocked = set(blocked)
+        self.deactivated = set(deactivated)
+        self.rng = random.Random(seed)
+        self._global = SlidingWindow(*global_limit)
+        self._chats = {}
+        # ("global" | "chat", "slept" | "raised") -> count
+        self.flood_waits = Counter()
+        self.errors = Counter()
+        # "file" / "broadcast" -> messages delivered (bot replies and edits not included)
+        self.delivered = Counter()
+        self.deleted = 0
+
+    async def _api(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self.rng.lognormvariate(0, LATENCY_SIGMA))
+
+    async def _admit(self, name, chat_id):
+        """Flood control and reachability for one outgoing message to chat_id"""
+        while True:
+            if chat_id in self.deactivated or chat_id in self.blocked:
+                await self._api(name)
+                error = InputUserDeactivated() if chat_id in self.deactivated else UserIsBlocked()
+                self.errors[type(error).__name__] += 1
+                raise error
+
+            now = time.monotonic()
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = SlidingWindow(*(self.private_limit if chat_id > 0 else self.group_limit))
+            global_wait, chat_wait = self._global.wait(now), chat.wait(now)
+            if not global_wait and not chat_wait:
+                self._global.add(now)
+                chat.add(now)
+                return
+
+            await self._api(name)
+            scope = "global" if global_wait >= chat_wait else "chat"
+            seconds = max(1, math.ceil(max(global_wait, chat_wait)))
+            if sending.get() or seconds > self.sleep_threshold:
+                self.flood_waits[scope, "raised"] += 1
+                raise FloodWait(value=seconds)
+            self.flood_waits[scope, "slept"] += 1
+            await asyncio.sleep(seconds)
+
+    def _record(self, chat_id, from_chat_id, count=1):
+        # Only messages reaching users; files come from the DB channels, broadcasts from the admin's chat
+        if chat_id > 0:
+            self.delivered["broadcast" if from_chat_id > 0 else "file"] += count
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self._admit("copy_message", chat_id)
+        result = await super().copy_message(chat_id, from_chat_id, message_id, **kwargs)
+        self._record(chat_id, from_chat_id)
+        return result
+
+    async def copy_media_group(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self._admit("copy_media_group", chat_id)
+        result = await super().copy_media_group(chat_id, from_chat_id, message_id, **kwargs)
+        self._record(chat_id, from_chat_id, len(result))
+        return result
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        await self._admit("send_media_group", chat_id)
+        result = await super().send_media_group(chat_id, media, **kwargs)
+        self._record(chat_id, CHANNEL_ID, len(result))
+        return result
+
+    async def forward_messages(self, chat_id, from_chat_id, message_ids, **kwargs):
+        await self._admit("forward_messages", chat_id)
+        result = await super().forward_messages(chat_id, from_chat_id, message_ids, **kwargs)
+        self._record(chat_id, from_chat_id, len(result) if isinstance(result, list) else 1)
+        return result
+
+    async def send_cached_media(self, chat_id, file_id, **kwargs):
+        await self._admit("send_cached_media", chat_id)
+        result = await super().send_cached_media(chat_id, file_id, **kwargs)
+        self._record(chat_id, CHANNEL_ID)
+        return result
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self._admit("send_message", chat_id)
+        return await super().send_message(chat_id, text, **kwargs)
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        await self._admit("edit_message_text", chat_id)
+        return await super().edit_message_text(chat_id, message_id, text, **kwargs)
+
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        await self._admit("delete_messages", chat_id)
+        result = await super().delete_messages(chat_id, message_ids, **kwargs)
+        self.deleted += 1 if isinstance(message_ids, int) else len(message_ids)
+        return result
+
+
+# ---------------------------------------------------------------- traffic ---
+# Events are (seconds from start, kind, data):
+#   ("file", {"user_id", "file_id", "category"})  a /start <file link>
+#   ("broadcast", {})                              an admin's /broadcast
+
+def viral_traffic(args, rng):
+    """--clicks users opening one link within --burst seconds, 20% of them twice"""
+    events = []
+    for i in range(args.clicks):
+        click = {"user_id": REQUESTER_BASE + i, "file_id": 1, "category": "short"}
+        at = rng.expovariate(3 / args.burst)
+        events.append((at, "file", click))
+        if rng.random() < 0.2:
+            events.append((at + rng.uniform(0.2, 2), "file", click))
+    return events
+
+
+def overlap_traffic(args, rng):
+    """A broadcast at t=0 and Poisson /start traffic at --rate per second for --duration seconds"""
+    events = [(0, "broadcast", {})]
+    at, i = 0, 0
+    while True:
+        at += rng.expovariate(args.rate)
+        if at >= args.duration:
+            return events
+        events.append((at, "file", {
+            "user_id": REQUESTER_BASE + i,
+            "file_id": rng.randint(1, args.files),
+            "category": "short" if rng.random() < 0.7 else "movie"
+        }))
+        i += 1
+
+
+def read_log(path):
+    """(timestamp, message) of every record in a plain or JSON-lines log file"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("{"):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                when, message = entry.get("time"), entry.get("message", "")
+            else:
+                match = LOG_LINE.match(line)
+                if not match:
+                    continue
+                when, message = match["time"], match["message"]
+            for fmt in LOG_TIME_FORMATS:
+                try:
+                    yield datetime.strptime(when, fmt).timestamp(), message
+                    break
+                except (TypeError, ValueError):
+                    continue
+
+
+def log_traffic(paths, rng):
+    """
+    Events rebuilt from the bot's log: delivered files, repeated taps and
+    broadcast starts. Log times have 1s resolution, so events are spread
+    over their second; "+N similar not logged" adds N requests for the same
+    file from other users within the preceding second.
+    """
+    records = sorted(record for path in paths for record in read_log(path))
+    events = []
+    extra_users = REQUESTER_BASE
+    for ts, message in records:
+        if match := FILE_SENT.search(message):
+            file_id, user_id, category = int(match[1]), int(match[2]), match[3]
+        elif match := REPEATED_TAP.search(message):
+            user_id, file_id, category = int(match[1]), int(match[2]), None
+        elif BROADCAST_STARTED.search(message):
+            events.append((ts + rng.random(), "broadcast", {}))
+            continue
+        else:
+            continue
+        events.append((ts + rng.random(), "file", {"user_id": user_id, "file_id": file_id, "category": category}))
+        if match := NOT_LOGGED.search(message):
+            for _ in range(int(match[1])):
+                extra_users += 1
+                events.append((ts - rng.random(), "file", {
+                    "user_id": extra_users, "file_id": file_id, "category": category
+                }))
+
+    if not events:
+        return events
+    start = min(at for at, _, _ in events)
+    return [(at - start, kind, data) for at, kind, data in events]
+
+
+# ----------------------------------------------------------------- runner ---
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+
+async def setup(args, events, rng):
+    """Fresh in-memory database with the requested files and the broadcast audience"""
+    db.__init__(DATABASE_URL, DATABASE_NAME)
+    install_fake_db(db)
+    helper_func.membership_cache.clear()
+    recent_taps.clear()
+    channel_info.__init__(channel_info.refresh_interval)
+
+    audience = list(range(AUDIENCE_BASE, AUDIENCE_BASE + args.users))
+    unreachable = rng.sample(audience, int(len(audience) * (args.blocked + args.deactivated)))
+    deactivated = unreachable[:int(len(audience) * args.deactivated)]
+    client = SimulatedClient(
+        latency=args.latency,
+        channel_id=CHANNEL_ID,
+        global_limit=(args.global_limit, 1),
+        private_limit=(args.chat_limit, args.chat_window),
+        group_limit=(args.group_limit, 60),
+        sleep_threshold=args.sleep_threshold,
+        blocked=unreachable[len(deactivated):],
+        deactivated=deactivated,
+        seed=args.seed
+    )
+
+    categories = {}
+    for _, kind, data in events:
+        if kind == "file":
+            categories[data["file_id"]] = data["category"] or categories.get(data["file_id"])
+    for file_id, category in categories.items():
+        post = client.add_post(CHANNEL_ID, file_id)
+        await db.add_file(file_id, file_id, category=category or "short", media=get_media_info(post))
+    for user_id in audience:
+        await db.users.insert_one({"_id": user_id})
+
+    requesters = {data["user_id"] for _, kind, data in events if kind == "file"}
+    joined = {user_id for user_id in sorted(requesters) if rng.random() < args.members}
+    channels = [FORCE_SUB_BASE - i for i in range(args.force_sub)]
+    for channel_id in channels:
+        await db.add_force_sub_channel(channel_id)
+    if channels:
+        client.members = {channel_id: set(joined) for channel_id in channels}
+    await db.set_setting("auto_delete_time", args.auto_delete)
+
+    for value in vars(db).values():
+        if isinstance(value, FakeCollection):
+            value.latency = args.db_latency
+    return client
+
+
+async def simulate(args, events, rng):
+    client = await setup(args, events, rng)
+    # Pyrogram runs at most `workers` handlers at once (bot.py uses 50)
+    workers = asyncio.Semaphore(args.workers)
+    latencies = []
+    requests = []
+    broadcasts = []
+
+    def member(user_id):
+        return client.members is None or all(user_id in users for users in client.members.values())
+
+    async def request(data, payload=None):
+        arrived = time.perf_counter()
+        joined = member(data["user_id"])
+        async with workers:
+            payload = payload or str(data["file_id"])
+            await start_command(client, client.user_message(data["user_id"], f"/start {encode(payload)}"))
+        latencies.append(time.perf_counter() - arrived)
+        if not joined:
+            # Got the join prompt: joins the channels, then taps "Try Again"
+            await asyncio.sleep(args.join_delay / args.speed)
+            for users in client.members.values():
+                users.add(data["user_id"])
+            await request(data, f"{RETRY_PREFIX}{data['file_id']}")
+
+    async def broadcast():
+        async with workers:
+            source = client.user_message(ADMIN_ID, "📢 Announcement")
+            message = client.user_message(ADMIN_ID, "/broadcast")
+            message.reply_to_message = source
+            running = set(broadcaster._tasks)
+            await broadcast_command(client, message)
+        broadcasts.extend(task for job_id, task in broadcaster._tasks.items() if job_id not in running)
+
+    auto_delete.tick = args.tick
+    await auto_delete.start(client)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for at, kind, data in sorted(events, key=lambda event: event[0]):
+        delay = started + at / args.speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        requests.append(asyncio.create_task(request(data) if kind == "file" else broadcast()))
+
+    await asyncio.gather(*requests)
+    requests_done = loop.time() - started
+    await asyncio.gather(*broadcasts)
+    elapsed = loop.time() - started
+
+    # Let the auto-delete loop remove what was delivered
+    deadline = loop.time() + args.auto_delete + DRAIN_TIMEOUT
+    while await db.pending_auto_delete_count() and loop.time() < deadline:
+        await asyncio.sleep(args.tick)
+    await auto_delete.stop()
+
+    deliveries = sum(client.delivered.values())
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies, default=0) * 1000,
+        "file_deliveries": client.delivered["file"],
+        "broadcast_deliveries": client.delivered["broadcast"],
+        "deliveries_per_sec": deliveries / elapsed if elapsed else 0.0,
+        "requests_seconds": requests_done,
+        "seconds": elapsed,
+        "flood_waits_slept": sum(n for (_, outcome), n in client.flood_waits.items() if outcome == "slept"),
+        "flood_waits_raised": sum(n for (_, outcome), n in client.flood_waits.items() if outcome == "raised"),
+        "global_flood_waits": sum(n for (scope, _), n in client.flood_waits.items() if scope == "global"),
+        "blocked": client.errors["UserIsBlocked"],
+        "deactivated": client.errors["InputUserDeactivated"],
+        "membership_checks": client.calls["get_chat_member"],
+        "auto_deleted": client.deleted,
+        "auto_delete_pending": await db.pending_auto_delete_count(),
+        "api_calls": sum(client.calls.values())
+    }
+
+
+SCENARIOS = {
+    "viral": viral_traffic,
+    "overlap": overlap_traffic,
+    "replay": lambda args, rng: log_traffic(args.log, rng),
+}
+
+
+async def main(args):
+    results = {}
+    for name in args.scenario:
+        rng = random.Random(args.seed)
+        events = SCENARIOS[name](args, rng)
+        if not events:
+            print(f"{name}: no traffic found")
+            continue
+        results[name] = await simulate(args, events, rng)
+        print(f"{name}: " + ", ".join(
+            f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in results[name].items()
+        ))
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": {k: v for k, v in vars(args).items() if k != "out"}
+        },
+        "results": results
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=["viral", "overlap"])
+    parser.add_argument("--log", nargs="+", default=["log.txt"], help="log files to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay time compression (10 = ten times the load)")
+    parser.add_argument("--clicks", type=int, default=300, help="users opening the link in the viral scenario")
+    parser.add_argument("--burst", type=float, default=10, help="seconds most viral clicks arrive within")
+    parser.add_argument("--users", type=int, default=500, help="broadcast audience")
+    parser.add_argument("--blocked", type=float, default=0.08, help="share of the audience that blocked the bot")
+    parser.add_argument("--deactivated", type=float, default=0.02, help="share of the audience with deleted accounts")
+    parser.add_argument("--rate", type=float, default=5, help="/start requests per second in the overlap scenario")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of /start traffic in the overlap scenario")
+    parser.add_argument("--files", type=int, default=50, help="distinct files requested in the overlap scenario")
+    parser.add_argument("--latency", type=float, default=0.08, help="median seconds per Telegram API call")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="seconds per MongoDB operation")
+    parser.add_argument("--workers", type=int, default=50, help="concurrent handlers (Pyrogram workers)")
+    parser.add_argument("--global-limit", type=int, default=30, help="messages per second per bot")
+    parser.add_argument("--chat-limit", type=int, default=20, help="messages per --chat-window in a private chat")
+    parser.add_argument("--chat-window", type=float, default=10, help="seconds of the private chat window")
+    parser.add_argument("--group-limit", type=int, default=20, help="messages per minute in a group or channel")
+    parser.add_argument("--force-sub", type=int, default=1, help="force-sub channels")
+    parser.add_argument("--members", type=float, default=0.9, help="share of the requesters who already joined them")
+    parser.add_argument("--join-delay", type=float, default=3, help="seconds a non-member takes to join and tap Try Again")
+    parser.add_argument("--auto-delete", type=int, default=10, help="auto-delete time of short files (seconds)")
+    parser.add_argument("--tick", type=float, default=2, help="auto-delete loop interval (seconds)")
+    parser.add_argument("--sleep-threshold", type=int, default=5, help="FloodWaits up to this many seconds outside the Sender are slept (bot.py)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    sys.exit(0)
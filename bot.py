@@ -1,7 +1,24 @@
 from pyrogram import Client
 from pyrogram.enums import ParseMode
+from pyrogram.errors import FloodWait
+from pyrogram.handlers import RawUpdateHandler
 import pyromod
-from config import API_HASH, API_ID, BOT_TOKEN, CHANNEL_ID, MOVIE_CHANNEL_ID, LOGGER
+from config import API_HASH, API_ID, BOT_TOKEN, CHANNEL_ID, MOVIE_CHANNEL_ID, FILE_CACHE_WARM, REINDEX_ON_START, LOGGER
+from core.auto_delete import auto_delete
+from core.channels import channel_info
+from core.conversations import conversations
+from core.broadcast import broadcaster
+from core.helpers import helpers
+from core.ingest import ingest
+from core.metrics import metrics
+from core.sender import sending
+from core.reindex import indexer
+from database.database import db
+import asyncio
+import time
+
+# FloodWaits up to this many seconds on calls outside the Sender are slept and retried
+FLOOD_SLEEP_THRESHOLD = 5
 
 class Bot(Client):
     def __init__(self):
@@ -12,37 +29,67 @@ class Bot(Client):
             bot_token=BOT_TOKEN,
             workers=50,
             plugins={"root": "plugins"},
-            sleep_threshold=5,
+            # Every FloodWait surfaces so the Sender can pause the chat (see invoke)
+            sleep_threshold=0,
             parse_mode=ParseMode.HTML
         )
         self.LOGGER = LOGGER
 
+    async def invoke(self, query, *args, **kwargs):
+        # Every Telegram API call passes through here; record latency, errors and FloodWaits
+        while True:
+            try:
+                return await metrics.track_api(super().invoke, query, *args, **kwargs)
+            except FloodWait as e:
+                # Sender calls are rescheduled by the Sender; short waits on anything else are slept here
+                if sending.get() or e.value > FLOOD_SLEEP_THRESHOLD:
+                    raise
+                LOGGER(__name__).warning(f"FloodWait on {type(query).__name__}, retrying in {e.value}s")
+                await asyncio.sleep(e.value)
+
     async def start(self):
-        await super().start()
-        usr_bot_me = await self.get_me()
-        self.username = usr_bot_me.username
+        started = time.perf_counter()
         
-        # Get database channels info
-        try:
-            self.db_channel = await self.get_chat(CHANNEL_ID)
-            LOGGER(__name__).info(f"SHORT Database Channel: {self.db_channel.title}")
-        except Exception as e:
-            LOGGER(__name__).error(f"Error connecting to SHORT DB channel: {e}")
-            LOGGER(__name__).error("Make sure bot is admin in the channel!")
-            exit(1)
+        # Updates that arrive while caches are loading wait here instead of failing
+        self.ready = asyncio.Event()
+        self.add_handler(RawUpdateHandler(self.wait_ready), group=-1000)
         
-        # Movie channel is optional
-        if MOVIE_CHANNEL_ID and MOVIE_CHANNEL_ID != 0:
-            try:
-                self.movie_channel = await self.get_chat(MOVIE_CHANNEL_ID)
-                LOGGER(__name__).info(f"MOVIE Database Channel: {self.movie_channel.title}")
-            except Exception as e:
-                LOGGER(__name__).warning(f"Movie channel not accessible: {e}")
-                LOGGER(__name__).warning("Movie features will be disabled. Set MOVIE_CHANNEL_ID to enable.")
-                self.movie_channel = None
-        else:
-            LOGGER(__name__).info("Movie channel disabled (MOVIE_CHANNEL_ID not set)")
-            self.movie_channel = None
+        # Telegram login and the first MongoDB round trip
+        await self.phase("connect", super().start(), self.check_database())
+        self.username = self.me.username
+        
+        # Everything handlers rely on, loaded concurrently
+        await self.phase(
+            "load",
+            self.resolve_channels(),
+            self.load_settings(),
+            # Known users in memory; new registrations are written in batches
+            db.load_users(),
+            # Existing deployments get their stats counters seeded before the first increment
+            db.ensure_stats(),
+            # Optional helper bots (HELPER_BOT_TOKENS); started before auto-delete so
+            # messages they sent can still be removed
+            helpers.start(self)
+        )
+        
+        # Background services: settings watcher, user writer, persisted
+        # auto-deletes, interrupted broadcasts and the metrics endpoint
+        self.settings_watcher = asyncio.create_task(db.watch_settings())
+        self.flusher = asyncio.create_task(db.run_flusher())
+        channel_info.start(self)
+        metrics.gauge("filebot_auto_delete_pending", "Messages waiting for auto-delete", db.pending_auto_delete_count)
+        metrics.gauge(
+            "filebot_conversation_states",
+            "Admins in the middle of a /batch, /custombatch or /genlink flow",
+            lambda: len(conversations)
+        )
+        await self.phase("services", auto_delete.start(self), broadcaster.resume(self), metrics.start())
+        
+        self.ready.set()
+        LOGGER(__name__).info(f"Bot ready in {time.perf_counter() - started:.2f}s")
+        
+        # Non-critical work runs after the gate opens
+        self.lazy_startup = asyncio.create_task(self.run_lazy_startup())
         
         LOGGER(__name__).info(f"Bot Started as @{self.username}!")
         LOGGER(__name__).info("=" * 50)
@@ -52,9 +99,91 @@ class Bot(Client):
             LOGGER(__name__).info(f"• MOVIE Channel: {self.movie_channel.title} ({MOVIE_CHANNEL_ID})")
         else:
             LOGGER(__name__).info("• MOVIE Channel: Disabled")
+        LOGGER(__name__).info(f"• Helper bots: {len(helpers.bots)}")
         LOGGER(__name__).info("=" * 50)
 
+    async def wait_ready(self, client, update, users, chats):
+        await self.ready.wait()
+
+    async def phase(self, name, *steps):
+        """Run startup steps concurrently and log how long the phase took"""
+        started = time.perf_counter()
+        results = await asyncio.gather(*steps)
+        LOGGER(__name__).info(f"Startup phase '{name}' took {time.perf_counter() - started:.2f}s")
+        return results
+
+    async def check_database(self):
+        try:
+            await db.ping()
+            LOGGER(__name__).info("Database Connected Successfully!")
+        except Exception as e:
+            LOGGER(__name__).error(f"Database Connection Error: {e}")
+            exit(1)
+
+    async def load_settings(self):
+        # Serve settings from memory, then warm force-sub channel titles, invite links and peers
+        await db.load_settings()
+        await channel_info.warm(self)
+
+    async def resolve_channels(self):
+        # Get database channels info (both at once)
+        short, movie = await asyncio.gather(
+            self.get_chat(CHANNEL_ID),
+            self.get_chat(MOVIE_CHANNEL_ID) if MOVIE_CHANNEL_ID else asyncio.sleep(0),
+            return_exceptions=True
+        )
+        
+        if isinstance(short, Exception):
+            LOGGER(__name__).error(f"Error connecting to SHORT DB channel: {short}")
+            LOGGER(__name__).error("Make sure bot is admin in the channel!")
+            exit(1)
+        self.db_channel = short
+        LOGGER(__name__).info(f"SHORT Database Channel: {self.db_channel.title}")
+        
+        # Movie channel is optional
+        self.movie_channel = None
+        if not MOVIE_CHANNEL_ID:
+            LOGGER(__name__).info("Movie channel disabled (MOVIE_CHANNEL_ID not set)")
+        elif isinstance(movie, Exception):
+            LOGGER(__name__).warning(f"Movie channel not accessible: {movie}")
+            LOGGER(__name__).warning("Movie features will be disabled. Set MOVIE_CHANNEL_ID to enable.")
+        else:
+            self.movie_channel = movie
+            LOGGER(__name__).info(f"MOVIE Database Channel: {self.movie_channel.title}")
+
+    async def run_lazy_startup(self):
+        try:
+            # Secondary indexes and the popular-file cache (a cold cache only costs reads)
+            await self.phase("lazy", db.ensure_indexes(), db.warm_file_cache(FILE_CACHE_WARM))
+            # Index channel posts made while the bot was offline
+            if REINDEX_ON_START:
+                await self.catch_up()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER(__name__).error(f"Lazy startup failed: {e}")
+
+    async def catch_up(self):
+        try:
+            results = await indexer.catch_up(self)
+            LOGGER(__name__).info(f"Startup reindex finished: {results}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER(__name__).error(f"Startup reindex failed: {e}")
+
     async def stop(self, *args):
+        self.lazy_startup.cancel()
+        await auto_delete.stop()
+        await channel_info.stop()
+        await broadcaster.stop()
+        await helpers.stop()
+        await metrics.stop()
+        self.settings_watcher.cancel()
+        self.flusher.cancel()
+        await ingest.stop()
+        await db.flush_users()
+        await db.flush_file_hits()
         await super().stop()
         LOGGER(__name__).info("Bot Stopped!")
 
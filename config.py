@@ -1,11 +1,14 @@
 import os
 import logging
 from logging.handlers import RotatingFileHandler
+from core.logs import setup_logging
 
 # Bot information
 API_ID = int(os.environ.get("API_ID", "0"))
 API_HASH = os.environ.get("API_HASH", "")
 BOT_TOKEN = os.environ.get("BOT_TOKEN", "")
+# Extra bot tokens (space or comma separated); each helper bot must be admin in the DB channels
+HELPER_BOT_TOKENS = os.environ.get("HELPER_BOT_TOKENS", "").replace(",", " ").split()
 
 # Database channels - IMPORTANT!
 CHANNEL_ID = int(os.environ.get("CHANNEL_ID", "0"))  # Short videos DB (AUTO-DELETE)
@@ -25,6 +28,14 @@ if OWNER_ID not in ADMINS:
 DATABASE_URL = os.environ.get("DATABASE_URL", "")
 DATABASE_NAME = os.environ.get("DATABASE_NAME", "filesharexbot")
 
+USER_FLUSH_INTERVAL = int(os.environ.get("USER_FLUSH_INTERVAL", "5"))  # Seconds between buffered user writes
+USER_FLUSH_SIZE = int(os.environ.get("USER_FLUSH_SIZE", "500"))  # Flush early once this many users are buffered
+LAST_SEEN_INTERVAL = int(os.environ.get("LAST_SEEN_INTERVAL", "3600"))  # Minimum seconds between last_seen updates per user
+FILE_CACHE_SIZE = int(os.environ.get("FILE_CACHE_SIZE", "5000"))  # File records kept in memory
+FILE_CACHE_TTL = int(os.environ.get("FILE_CACHE_TTL", "3600"))
+FILE_CACHE_WARM = int(os.environ.get("FILE_CACHE_WARM", "500"))  # Most requested files preloaded at startup
+SETTINGS_POLL_INTERVAL = int(os.environ.get("SETTINGS_POLL_INTERVAL", "30"))  # Used when change streams are unavailable
+
 # Multiple Force Subscribe Channels (comma-separated)
 FORCE_SUB_CHANNELS = os.environ.get("FORCE_SUB_CHANNELS", "0")
 # Convert to list of integers
@@ -33,6 +44,16 @@ if FORCE_SUB_CHANNELS:
 else:
     FORCE_SUB_CHANNELS = []
 
+# Force subscribe membership cache (seconds)
+FSUB_CACHE_POSITIVE_TTL = int(os.environ.get("FSUB_CACHE_POSITIVE_TTL", "600"))  # Joined users
+FSUB_CACHE_NEGATIVE_TTL = int(os.environ.get("FSUB_CACHE_NEGATIVE_TTL", "30"))  # Users not joined yet
+FSUB_CACHE_SIZE = int(os.environ.get("FSUB_CACHE_SIZE", "100000"))
+CHANNEL_INFO_REFRESH = int(os.environ.get("CHANNEL_INFO_REFRESH", "3600"))  # Channel title/invite link refresh interval
+
+# Repeated taps on the same link by the same user within this many seconds are delivered once
+DUPLICATE_TAP_WINDOW = int(os.environ.get("DUPLICATE_TAP_WINDOW", "5"))
+DUPLICATE_TAP_CACHE_SIZE = int(os.environ.get("DUPLICATE_TAP_CACHE_SIZE", "100000"))
+
 # Protect content
 PROTECT_CONTENT = os.environ.get("PROTECT_CONTENT", "False").lower() == "true"
 
@@ -45,6 +66,34 @@ AUTO_DELETE_MSG = os.environ.get("AUTO_DELETE_MSG",
 AUTO_DEL_SUCCESS_MSG = os.environ.get("AUTO_DEL_SUCCESS_MSG",
     "✅ File deleted successfully after the specified time."
 )
+AUTO_DELETE_TICK = int(os.environ.get("AUTO_DELETE_TICK", "30"))  # How often pending deletions are processed (seconds)
+
+# Outgoing message rate limits (messages per second)
+GLOBAL_SEND_RATE = float(os.environ.get("GLOBAL_SEND_RATE", "25"))  # Across all chats
+CHAT_SEND_RATE = float(os.environ.get("CHAT_SEND_RATE", "1"))  # Per private chat
+GROUP_SEND_RATE = float(os.environ.get("GROUP_SEND_RATE", "0.33"))  # Per group/channel (~20 per minute)
+CHAT_SEND_BURST = int(os.environ.get("CHAT_SEND_BURST", "5"))  # Messages a chat may receive back-to-back
+# Guaranteed shares of the global budget for interactive / batch / broadcast & auto-delete sends
+SEND_LANE_WEIGHTS = [int(x) for x in os.environ.get("SEND_LANE_WEIGHTS", "6,3,1").split(",")]
+
+# Broadcast
+BROADCAST_WORKERS = int(os.environ.get("BROADCAST_WORKERS", "20"))  # Concurrent senders per broadcast
+BROADCAST_PAGE_SIZE = int(os.environ.get("BROADCAST_PAGE_SIZE", "500"))  # Users per checkpoint
+
+# Ingest: channel posts / admin uploads arriving together are stored and answered as one batch
+INGEST_WINDOW = float(os.environ.get("INGEST_WINDOW", "2"))  # Seconds to wait for more files
+INGEST_MAX_BATCH = int(os.environ.get("INGEST_MAX_BATCH", "100"))  # Flush early at this many files
+
+# Reindex: scan the DB channels for posts missed while the bot was offline
+REINDEX_ON_START = os.environ.get("REINDEX_ON_START", "True").lower() == "true"
+
+# Batch links
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "500"))  # Files per stored batch link
+
+# Admin conversations (/batch, /custombatch, /genlink)
+CONVERSATION_TTL = int(os.environ.get("CONVERSATION_TTL", "900"))  # Seconds an unfinished flow is kept
+CONVERSATION_MAX = int(os.environ.get("CONVERSATION_MAX", "1000"))  # Flows kept in memory
+CONVERSATION_PERSIST = os.environ.get("CONVERSATION_PERSIST", "True").lower() == "true"  # Keep flows in MongoDB across restarts/replicas
 
 # Start message
 START_MESSAGE = os.environ.get("START_MESSAGE",
@@ -81,11 +130,16 @@ USER_REPLY_TEXT = os.environ.get("USER_REPLY_TEXT",
 # Join request
 JOIN_REQUEST_ENABLED = os.environ.get("JOIN_REQUEST_ENABLED", "False").lower() == "true"
 
+# Metrics endpoint (http://METRICS_HOST:METRICS_PORT/metrics), disabled when 0
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+
 # Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s - %(levelname)s] - %(name)s - %(message)s",
-    datefmt='%d-%b-%y %H:%M:%S',
+LOG_JSON = os.environ.get("LOG_JSON", "False").lower() == "true"  # One JSON object per line
+LOG_DELIVERY_RATE = float(os.environ.get("LOG_DELIVERY_RATE", "5"))  # Per-delivery info lines per second (0 = all)
+
+# Records are queued and written by a background thread (see core/logs.py)
+LOG_LISTENER = setup_logging(
     handlers=[
         RotatingFileHandler(
             "log.txt",
@@ -93,7 +147,11 @@ logging.basicConfig(
             backupCount=10
         ),
         logging.StreamHandler()
-    ]
+    ],
+    level=logging.INFO,
+    fmt="[%(asctime)s - %(levelname)s] - %(name)s - %(message)s",
+    datefmt='%d-%b-%y %H:%M:%S',
+    json_lines=LOG_JSON
 )
 logging.getLogger("pyrogram").setLevel(logging.WARNING)
 
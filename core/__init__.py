@@ -0,0 +1,2 @@
+# This file makes the core directory a Python package
+# Shared background services used by the bot and its plugins
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import defaultdict
+from pyrogram.errors import BadRequest, Forbidden
+from database.database import db
+from core.sender import sender, BULK
+from core.helpers import helpers
+from core.logs import ErrorSummary
+from config import AUTO_DEL_SUCCESS_MSG, AUTO_DELETE_TICK, LOGGER
+
+# Telegram accepts at most 100 message IDs per delete_messages call
+DELETE_CHUNK_SIZE = 100
+# Deadlines loaded from MongoDB per query while draining a tick
+FETCH_LIMIT = 1000
+# Blocked bot, deleted chat, messages already gone: retrying cannot help
+PERMANENT_ERRORS = (BadRequest, Forbidden)
+# Other failures (network, Telegram 5xx) are retried this much later, a few times
+RETRY_DELAY = 60
+MAX_ATTEMPTS = 5
+
+
+class AutoDeleteScheduler:
+    """
+    Restart-safe auto-delete queue.
+
+    Deadlines live in the `auto_delete` collection instead of one sleeping
+    task per delivered file. A single loop wakes every tick, groups expired
+    messages per chat and removes them with one delete_messages call;
+    each chat gets one AUTO_DEL_SUCCESS_MSG per tick. Entries that failed
+    for a transient reason are kept and retried after RETRY_DELAY seconds.
+    """
+
+    def __init__(self, tick):
+        self.tick = tick
+        self._client = None
+        self._task = None
+        # Logged once per tick instead of once per chat
+        self._deleted = self._chats = 0
+        self._errors = ErrorSummary(LOGGER(__name__), "Auto-delete")
+
+    async def schedule(self, chat_id, message_ids, delay, bot_id=None):
+        """Persist deletion deadlines for messages sent to a chat (by a helper bot when bot_id is set)"""
+        if not delay or not message_ids:
+            return
+        await db.add_auto_delete(chat_id, list(message_ids), time.time() + delay, bot_id)
+
+    async def start(self, client):
+        self._client = client
+        if self._task is None:
+            # Deletions and their notices give way to file deliveries
+            with sender.lane(BULK):
+                self._task = asyncio.create_task(self._run())
+        LOGGER(__name__).info(
+            f"Auto-delete scheduler started ({await db.pending_auto_delete_count()} pending)"
+        )
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.process_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOGGER(__name__).error(f"Auto-delete tick failed: {e}")
+            await asyncio.sleep(self.tick)
+
+    async def process_due(self):
+        """Delete every message whose deadline has passed"""
+        self._deleted = self._chats = 0
+        try:
+            await self._drain()
+        finally:
+            if self._deleted:
+                LOGGER(__name__).info(f"Auto-deleted {self._deleted} file(s) in {self._chats} chat(s)")
+            self._errors.flush()
+
+    async def _drain(self):
+        # A chat whose messages span several pages still gets a single notice
+        notify = set()
+        while True:
+            due = await db.get_due_auto_deletes(time.time(), limit=FETCH_LIMIT)
+            if not due:
+                break
+
+            by_chat = defaultdict(list)
+            for entry in due:
+                by_chat[(entry.get("bot_id"), entry["chat_id"])].append(entry)
+
+            for (bot_id, chat_id), entries in by_chat.items():
+                entry_ids = [entry["_id"] for entry in entries]
+                message_ids = [entry["message_id"] for entry in entries]
+                try:
+                    deleted = await self._delete_for_chat(chat_id, message_ids, bot_id)
+                except PERMANENT_ERRORS as e:
+                    self._errors.add(e, f"user {chat_id}", quiet=True)
+                except Exception as e:
+                    self._errors.add(e, f"user {chat_id}")
+                    if max(entry.get("attempts", 0) for entry in entries) + 1 < MAX_ATTEMPTS:
+                        # Kept with a later deadline, so this tick does not fetch them again
+                        await db.retry_auto_deletes(entry_ids, time.time() + RETRY_DELAY)
+                        continue
+                else:
+                    if deleted:
+                        notify.add((bot_id, chat_id))
+                        self._deleted += len(message_ids)
+                await db.remove_auto_deletes(entry_ids)
+
+            if len(due) < FETCH_LIMIT:
+                break
+
+        for bot_id, chat_id in notify:
+            client, chat_sender = self._chat_client(bot_id)
+            try:
+                await chat_sender.send_message(client, chat_id, AUTO_DEL_SUCCESS_MSG)
+            except Exception as e:
+                self._errors.add(e, f"notice to {chat_id}", quiet=isinstance(e, PERMANENT_ERRORS))
+        self._chats = len(notify)
+
+    def _chat_client(self, bot_id):
+        """(client, sender) of the bot that sent the messages; None if that helper is gone"""
+        if not bot_id:
+            return self._client, sender
+        helper = helpers.get(bot_id)
+        return (helper.client, helper.sender) if helper else None
+
+    async def _delete_for_chat(self, chat_id, message_ids, bot_id=None):
+        """False if the messages cannot be deleted any more; errors are raised"""
+        # Only the bot that sent the messages can delete them
+        chat_client = self._chat_client(bot_id)
+        if chat_client is None:
+            LOGGER(__name__).warning(f"Helper bot {bot_id} is gone, cannot delete {len(message_ids)} file(s) for {chat_id}")
+            return False
+        client, chat_sender = chat_client
+        for i in range(0, len(message_ids), DELETE_CHUNK_SIZE):
+            await chat_sender.delete_messages(client, chat_id, message_ids[i:i + DELETE_CHUNK_SIZE])
+        return True
+
+
+auto_delete = AutoDeleteScheduler(AUTO_DELETE_TICK)
@@ -0,0 +1,210 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from pyrogram.errors import InputUserDeactivated, UserIsBlocked
+from database.database import db
+from core.sender import sender, BULK
+from core.helpers import helpers
+from core.metrics import metrics
+from core.logs import ErrorSummary
+from config import BROADCAST_WORKERS, BROADCAST_PAGE_SIZE, CHANNEL_ID, LOGGER
+
+# Minimum seconds between progress edits of the status message
+STATUS_INTERVAL = 10
+
+
+class BroadcastEngine:
+    """
+    Resumable broadcast jobs stored in the `broadcasts` collection.
+
+    Users are scanned in `_id` order one page at a time (IDs only). Each
+    page is sent by up to BROADCAST_WORKERS concurrent senders sharing the
+    global send budget, then checkpointed, so a restart continues after the
+    last completed page. Deactivated accounts are deleted in bulk at the end.
+
+    With helper bots configured, copy broadcasts are staged in the DB channel
+    (helpers cannot read the admin's chat) and users who started a helper
+    are served by whichever bot has the shorter queue.
+    """
+
+    def __init__(self, workers, page_size):
+        self.workers = workers
+        self.page_size = page_size
+        self._tasks = {}
+        self._cancelled = set()
+
+    async def start_job(self, client, mode, source_message, admin_id, status_message, delay=0):
+        """Create a job for copy/forward of source_message and run it in the background"""
+        job = {
+            "mode": mode,
+            "from_chat_id": source_message.chat.id,
+            "message_id": source_message.id,
+            "admin_id": admin_id,
+            "status_chat_id": status_message.chat.id,
+            "status_message_id": status_message.id,
+            "status": "running",
+            "last_user_id": None,
+            "total": await db.total_users_count(),
+            "counters": {"success": 0, "failed": 0, "blocked": 0, "deleted": 0},
+            "dead_users": [],
+            "created_at": datetime.now(timezone.utc)
+        }
+        if mode == "copy" and helpers.enabled:
+            stash = await sender.copy(source_message, CHANNEL_ID)
+            job["stash_message_id"] = stash.id
+        job["_id"] = await db.create_broadcast(job)
+        # Broadcast sends give way to file deliveries
+        with sender.lane(BULK):
+            self._tasks[job["_id"]] = asyncio.create_task(self._run(client, job, delay))
+        return job["_id"]
+
+    async def resume(self, client):
+        """Continue jobs that were running when the bot stopped"""
+        for job in await db.get_running_broadcasts():
+            if job["_id"] not in self._tasks:
+                LOGGER(__name__).info(f"Resuming broadcast {job['_id']} after user {job.get('last_user_id')}")
+                with sender.lane(BULK):
+                    self._tasks[job["_id"]] = asyncio.create_task(self._run(client, job))
+
+    async def cancel(self):
+        """Cancel every running broadcast; returns how many were stopped"""
+        jobs = await db.get_running_broadcasts()
+        for job in jobs:
+            self._cancelled.add(job["_id"])
+            await db.update_broadcast(job["_id"], {"status": "cancelled"})
+        return len(jobs)
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    async def _run(self, client, job, delay=0):
+        job_id = job["_id"]
+        counters = job["counters"]
+        last_user_id = job.get("last_user_id")
+        dead_users = list(job.get("dead_users", []))
+        last_status = started = time.monotonic()
+        # One summary line per job instead of a line per failed user
+        errors = ErrorSummary(LOGGER(__name__), f"Broadcast {job_id}")
+
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+
+            semaphore = asyncio.Semaphore(self.workers)
+
+            async def send_one(user_id, page_dead, page_bots):
+                async with semaphore:
+                    if job_id in self._cancelled:
+                        return
+                    try:
+                        if job["mode"] == "forward":
+                            await sender.send(user_id, client.forward_messages, user_id, job["from_chat_id"], job["message_id"])
+                        elif job.get("stash_message_id") and user_id in page_bots:
+                            await helpers.send(
+                                user_id,
+                                page_bots[user_id],
+                                lambda bot: bot.copy_message(user_id, CHANNEL_ID, job["stash_message_id"]),
+                                lambda: sender.send(user_id, client.copy_message, user_id, job["from_chat_id"], job["message_id"])
+                            )
+                        else:
+                            await sender.send(user_id, client.copy_message, user_id, job["from_chat_id"], job["message_id"])
+                        counters["success"] += 1
+                    except InputUserDeactivated as e:
+                        counters["deleted"] += 1
+                        page_dead.append(user_id)
+                        errors.add(e, quiet=True)
+                    except UserIsBlocked as e:
+                        counters["blocked"] += 1
+                        errors.add(e, quiet=True)
+                    except Exception as e:
+                        counters["failed"] += 1
+                        errors.add(e, f"user {user_id}")
+
+            while job_id not in self._cancelled:
+                user_ids = await db.get_user_ids_after(last_user_id, self.page_size)
+                if not user_ids:
+                    break
+
+                page_dead = []
+                page_bots = await helpers.user_bots(user_ids) if job.get("stash_message_id") else {}
+                await asyncio.gather(*(send_one(user_id, page_dead, page_bots) for user_id in user_ids))
+                last_user_id = user_ids[-1]
+                dead_users.extend(page_dead)
+
+                # Checkpoint; a job cancelled from another process is no longer "running"
+                still_running = await db.checkpoint_broadcast(job_id, last_user_id, counters, page_dead)
+                if not still_running:
+                    self._cancelled.add(job_id)
+
+                if time.monotonic() - last_status >= STATUS_INTERVAL:
+                    last_status = time.monotonic()
+                    await self._edit_status(client, job, self._progress_text(job))
+
+            cancelled = job_id in self._cancelled
+            if dead_users:
+                await db.delete_users(dead_users)
+            await db.update_broadcast(job_id, {"status": "cancelled" if cancelled else "done"})
+            if job.get("stash_message_id"):
+                await self._remove_stash(client, job)
+            await self._edit_status(client, job, self._final_text(job, cancelled))
+            metrics.handler_seconds.observe(time.monotonic() - started, "broadcast")
+
+            LOGGER(__name__).info(
+                f"Broadcast {job_id} by admin {job['admin_id']} "
+                f"{'cancelled' if cancelled else 'completed'}: "
+                f"{counters['success']} success, {counters['failed']} failed"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER(__name__).error(f"Broadcast {job_id} stopped with error: {e}")
+        finally:
+            errors.flush()
+            self._tasks.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+    async def _remove_stash(self, client, job):
+        try:
+            await client.delete_messages(CHANNEL_ID, job["stash_message_id"])
+        except Exception as e:
+            LOGGER(__name__).warning(f"Could not delete staged broadcast post {job['stash_message_id']}: {e}")
+
+    async def _edit_status(self, client, job, text):
+        try:
+            await client.edit_message_text(job["status_chat_id"], job["status_message_id"], text)
+        except Exception as e:
+            LOGGER(__name__).warning(f"Could not update broadcast status: {e}")
+
+    def _progress_text(self, job):
+        c = job["counters"]
+        title = "Forward Broadcasting..." if job["mode"] == "forward" else "Broadcasting..."
+        return (
+            f"📢 **{title}**\n\n"
+            f"✅ Success: {c['success']}\n"
+            f"❌ Failed: {c['failed']}\n"
+            f"🚫 Blocked: {c['blocked']}\n"
+            f"❌ Deleted: {c['deleted']}\n\n"
+            f"⏳ Progress: {sum(c.values())}/{job['total']}\n\n"
+            "Send `/cancel` to stop."
+        )
+
+    def _final_text(self, job, cancelled):
+        c = job["counters"]
+        title = "Forward Broadcast" if job["mode"] == "forward" else "Broadcast"
+        header = f"🛑 **{title} Cancelled!**" if cancelled else f"✅ **{title} Complete!**"
+        rate = (c["success"] / job["total"]) * 100 if job["total"] else 0
+        return (
+            f"{header}\n\n"
+            f"📊 **Statistics:**\n"
+            f"✅ Success: {c['success']}\n"
+            f"❌ Failed: {c['failed']}\n"
+            f"🚫 Blocked: {c['blocked']}\n"
+            f"🗑 Deleted Accounts: {c['deleted']}\n\n"
+            f"👥 Total: {job['total']}\n"
+            f"📈 Success Rate: {rate:.1f}%"
+        )
+
+
+broadcaster = BroadcastEngine(BROADCAST_WORKERS, BROADCAST_PAGE_SIZE)
@@ -0,0 +1,104 @@
+import asyncio
+from database.database import db
+from config import FORCE_SUB_CHANNELS, CHANNEL_INFO_REFRESH, LOGGER
+
+
+class ChannelInfoCache:
+    """
+    Title and invite link per force-sub channel.
+
+    Entries are persisted in the `channels` collection so a restart reuses
+    the stored invite link instead of exporting (and minting) a new one.
+    A background loop refreshes titles and links every CHANNEL_INFO_REFRESH
+    seconds; /addfsub and /delfsub invalidate single entries.
+    """
+
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._info = {}
+        self._locks = {}
+        self._loaded = False
+        self._task = None
+
+    async def load(self):
+        self._info = await db.get_all_channel_info()
+        self._loaded = True
+
+    async def warm(self, client):
+        """Load stored entries and fetch the force-sub channels that have none (startup)"""
+        await self.load()
+        channel_ids = list(set(FORCE_SUB_CHANNELS + await db.get_force_sub_channels()))
+        await self.get_many(client, channel_ids)
+
+    async def get(self, client, channel_id):
+        """Return {"title", "invite_link"} for a channel, fetching it once if unknown"""
+        if not self._loaded:
+            await self.load()
+        info = self._info.get(channel_id)
+        if info is None:
+            info = await self.refresh(client, channel_id, only_missing=True)
+        return info
+
+    async def get_many(self, client, channel_ids):
+        """Return info per channel (None where it could not be fetched), in order"""
+        results = await asyncio.gather(
+            *(self.get(client, channel_id) for channel_id in channel_ids),
+            return_exceptions=True
+        )
+        infos = []
+        for channel_id, result in zip(channel_ids, results):
+            if isinstance(result, Exception):
+                LOGGER(__name__).error(f"Error getting channel info for {channel_id}: {result}")
+                result = None
+            infos.append(result)
+        return infos
+
+    async def refresh(self, client, channel_id, only_missing=False):
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            stored = self._info.get(channel_id)
+            if only_missing and stored is not None:
+                return stored
+
+            chat = await client.get_chat(channel_id)
+            invite_link = chat.invite_link or (stored or {}).get("invite_link")
+            if not invite_link:
+                invite_link = await client.export_chat_invite_link(channel_id)
+
+            info = {"title": chat.title, "invite_link": invite_link}
+            if info != stored:
+                await db.save_channel_info(channel_id, chat.title, invite_link)
+            self._info[channel_id] = info
+            return info
+
+    async def invalidate(self, channel_id):
+        self._info.pop(channel_id, None)
+        await db.delete_channel_info(channel_id)
+
+    def start(self, client):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(client))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, client):
+        # warm() already filled the cache at startup
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                channel_ids = set(FORCE_SUB_CHANNELS + await db.get_force_sub_channels())
+                for channel_id in channel_ids:
+                    try:
+                        await self.refresh(client, channel_id)
+                    except Exception as e:
+                        LOGGER(__name__).warning(f"Could not refresh channel {channel_id}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOGGER(__name__).error(f"Channel info refresh failed: {e}")
+
+
+channel_info = ChannelInfoCache(CHANNEL_INFO_REFRESH)
@@ -0,0 +1,73 @@
+from database.database import db
+from core.cache import TTLCache
+from config import CONVERSATION_TTL, CONVERSATION_MAX, CONVERSATION_PERSIST, LOGGER
+
+
+class ConversationRouter:
+    """
+    Per-admin state of multi-message flows (/batch, /custombatch, /genlink).
+
+    Each admin has at most one active flow, stored as {"flow": name, ...}.
+    Incoming messages are dispatched to the handler registered for that
+    flow with one lookup. States expire after CONVERSATION_TTL seconds of
+    inactivity and at most CONVERSATION_MAX are kept in memory; with
+    CONVERSATION_PERSIST they are mirrored to the `conversations` collection
+    so a flow survives restarts and works across replicas.
+    """
+
+    def __init__(self, maxsize, ttl, persist):
+        self.ttl = ttl
+        self.persist = persist
+        self._states = TTLCache(maxsize, ttl)
+        self._handlers = {}
+
+    def route(self, flow):
+        """Decorator registering handler(client, message, state) for a flow"""
+        def decorator(func):
+            self._handlers[flow] = func
+            return func
+        return decorator
+
+    async def get(self, user_id):
+        state = self._states.get(user_id)
+        if state is None and self.persist:
+            state = await db.get_conversation(user_id)
+            if state is not None:
+                self._states.set(user_id, state)
+        return state
+
+    async def start(self, user_id, flow, **data):
+        """Begin a flow, replacing whatever the admin was doing before"""
+        state = {"flow": flow, **data}
+        await self.save(user_id, state)
+        return state
+
+    async def save(self, user_id, state):
+        """Store a changed state (also restarts its TTL)"""
+        self._states.set(user_id, state)
+        if self.persist:
+            await db.save_conversation(user_id, state, self.ttl)
+
+    async def end(self, user_id):
+        self._states.pop(user_id)
+        if self.persist:
+            await db.delete_conversation(user_id)
+
+    async def dispatch(self, client, message):
+        """Hand a message to the admin's current flow; False if there is none"""
+        state = await self.get(message.from_user.id)
+        if state is None:
+            return False
+        handler = self._handlers.get(state["flow"])
+        if handler is None:
+            LOGGER(__name__).warning(f"No handler for conversation flow {state['flow']}")
+            await self.end(message.from_user.id)
+            return False
+        await handler(client, message, state)
+        return True
+
+    def __len__(self):
+        return len(self._states)
+
+
+conversations = ConversationRouter(CONVERSATION_MAX, CONVERSATION_TTL, CONVERSATION_PERSIST)
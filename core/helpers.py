@@ -0,0 +1,147 @@
+import asyncio
+from pyrogram import Client, filters
+from pyrogram.enums import ParseMode
+from pyrogram.errors import FloodWait, UserIsBlocked, InputUserDeactivated, PeerIdInvalid
+from pyrogram.handlers import MessageHandler
+from database.database import db
+from core.sender import Sender, sender
+from core.metrics import metrics
+from core.logs import RateLimitedLog
+from config import (
+    API_ID, API_HASH, HELPER_BOT_TOKENS, CHANNEL_ID, MOVIE_CHANNEL_ID,
+    GLOBAL_SEND_RATE, CHAT_SEND_RATE, GROUP_SEND_RATE, CHAT_SEND_BURST, LOG_DELIVERY_RATE, LOGGER
+)
+
+# Errors meaning this helper can no longer reach the user
+UNREACHABLE_ERRORS = (UserIsBlocked, InputUserDeactivated, PeerIdInvalid)
+
+# Failed helper sends fall back to the main bot; a few lines per second are enough
+failure_log = RateLimitedLog(LOGGER(__name__), LOG_DELIVERY_RATE)
+
+
+class HelperClient(Client):
+    async def invoke(self, query, *args, **kwargs):
+        return await metrics.track_api(super().invoke, query, *args, **kwargs)
+
+
+class HelperBot:
+    """One extra bot token with its own send budget"""
+
+    def __init__(self, client):
+        self.client = client
+        self.sender = Sender(GLOBAL_SEND_RATE, CHAT_SEND_RATE, GROUP_SEND_RATE, CHAT_SEND_BURST)
+        self.id = None
+        self.username = None
+
+
+class HelperPool:
+    """
+    Optional pool of helper bots (HELPER_BOT_TOKENS) sharing delivery work.
+
+    Bot API limits apply per token, so every helper has its own Sender.
+    A bot can only message users who started it: helpers record their
+    /start users in `helper_users`, and a send goes to whichever of the
+    user's helpers has the shortest queue, provided it is shorter than the
+    main bot's. On FloodWait or a blocked helper the next candidate is
+    tried, and the main bot is always the last resort.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.bots = {}
+        self.main_username = None
+
+    @property
+    def enabled(self):
+        return bool(self.bots)
+
+    def get(self, bot_id):
+        return self.bots.get(bot_id)
+
+    async def start(self, main_client):
+        self.main_username = main_client.username
+        # Helpers connect concurrently; one failing token doesn't hold up the others
+        await asyncio.gather(*(
+            self._start_helper(i, token) for i, token in enumerate(self.tokens, start=1)
+        ))
+
+    async def _start_helper(self, i, token):
+        client = HelperClient(
+            name=f"FileShareHelper{i}",
+            api_id=API_ID,
+            api_hash=API_HASH,
+            bot_token=token,
+            workers=4,
+            # FloodWaits must surface immediately so the pool can fail over
+            sleep_threshold=0,
+            parse_mode=ParseMode.HTML
+        )
+        helper = HelperBot(client)
+        client.add_handler(MessageHandler(
+            self._start_handler(helper), filters.command("start") & filters.private
+        ))
+        try:
+            await client.start()
+            helper.id, helper.username = client.me.id, client.me.username
+            # Helpers copy straight from the DB channels
+            await client.get_chat(CHANNEL_ID)
+            if MOVIE_CHANNEL_ID:
+                await client.get_chat(MOVIE_CHANNEL_ID)
+        except Exception as e:
+            LOGGER(__name__).error(f"Helper bot #{i} disabled: {e}")
+            if client.is_connected:
+                await client.stop()
+            return
+        self.bots[helper.id] = helper
+        LOGGER(__name__).info(f"Helper bot @{helper.username} ready")
+
+    async def stop(self):
+        for helper in self.bots.values():
+            try:
+                await helper.client.stop()
+            except Exception as e:
+                LOGGER(__name__).warning(f"Error stopping helper @{helper.username}: {e}")
+        self.bots.clear()
+
+    def _start_handler(self, helper):
+        async def on_start(client, message):
+            await db.add_helper_user(message.from_user.id, helper.id)
+            await helper.sender.send(
+                message.chat.id,
+                message.reply_text,
+                f"✅ Linked! When @{self.main_username} is busy, your files will be delivered here."
+            )
+        return on_start
+
+    async def user_bots(self, user_ids):
+        """Helper bot IDs each user can be reached through ({} when the pool is off)"""
+        if not self.enabled:
+            return {}
+        return await db.get_helper_bots(user_ids)
+
+    def candidates(self, user_id, bot_ids):
+        """User's helpers that currently have a shorter queue than the main bot"""
+        main_backlog = sender.backlog(user_id)
+        helpers = [self.bots[bot_id] for bot_id in bot_ids if bot_id in self.bots]
+        helpers = [helper for helper in helpers if helper.sender.backlog(user_id) < main_backlog]
+        return sorted(helpers, key=lambda helper: helper.sender.backlog(user_id))
+
+    async def send(self, user_id, bot_ids, via_helper, via_main, cost=1):
+        """
+        Deliver through the least busy client.
+        via_helper(client) and via_main() return awaitables; returns
+        (helper bot ID or None for the main bot, result).
+        """
+        for helper in self.candidates(user_id, bot_ids):
+            try:
+                return helper.id, await helper.sender.try_send(user_id, via_helper, helper.client, cost=cost)
+            except FloodWait:
+                continue
+            except UNREACHABLE_ERRORS:
+                await db.remove_helper_user(user_id, helper.id)
+            except Exception as e:
+                failure_log.warning(f"Helper @{helper.username} failed for {user_id}: {e}")
+        return None, await via_main()
+
+
+helpers = HelperPool(HELPER_BOT_TOKENS)
@@ -0,0 +1,161 @@
+import asyncio
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from database.database import db
+from core.sender import sender
+from helper_func import encode, get_media_info
+from config import CHANNEL_ID, DISABLE_CHANNEL_BUTTON, INGEST_WINDOW, INGEST_MAX_BATCH, LOGGER
+
+# forward_messages accepts at most 100 message IDs per call
+FORWARD_CHUNK_SIZE = 100
+# Links per digest message (keeps each reply well under Telegram's 4096 characters)
+DIGEST_LINES = 40
+
+SINGLE_TEXT = {
+    "short": (
+        "📦 **Short File Link (Auto-Delete)**\n\n"
+        "🔗 Link: `{link}`\n\n"
+        "⚠️ This file will be auto-deleted after the set time."
+    ),
+    "movie": (
+        "🎬 **Movie File Link (Permanent)**\n\n"
+        "🔗 Link: `{link}`\n\n"
+        "✅ This file will NOT be deleted automatically."
+    ),
+    "upload": (
+        "✅ **File uploaded to SHORT database!**\n\n"
+        "🔗 Link: `{link}`\n\n"
+        "⚠️ Auto-delete enabled\n"
+        "📝 To create permanent movie links, send to Movie DB channel."
+    ),
+}
+
+DIGEST_TEXT = {
+    "short": (
+        "📦 **{count} Short File Links (Auto-Delete)**\n\n{links}\n\n"
+        "⚠️ These files will be auto-deleted after the set time."
+    ),
+    "movie": (
+        "🎬 **{count} Movie File Links (Permanent)**\n\n{links}\n\n"
+        "✅ These files will NOT be deleted automatically."
+    ),
+    "upload": (
+        "✅ **{count} files uploaded to SHORT database!**\n\n{links}\n\n"
+        "⚠️ Auto-delete enabled\n"
+        "📝 To create permanent movie links, send to Movie DB channel."
+    ),
+}
+
+
+class IngestBuffer:
+    """
+    Coalesced file ingest.
+
+    Channel posts ("short" / "movie") and admin uploads ("upload") arriving
+    within INGEST_WINDOW seconds of each other are collected per chat and
+    stored with one bulk upsert, so replayed updates are harmless. Each
+    group gets one digest reply instead of one message per file, and
+    uploads are forwarded to the SHORT channel in multi-ID calls.
+    """
+
+    def __init__(self, window, max_batch):
+        self.window = window
+        self.max_batch = max_batch
+        self._client = None
+        self._pending = {}
+        self._timers = {}
+
+    async def add(self, client, kind, message):
+        """Queue a channel post or admin upload; kind is "short", "movie" or "upload" """
+        self._client = client
+        key = (kind, message.chat.id)
+        self._pending.setdefault(key, []).append(message)
+        if len(self._pending[key]) >= self.max_batch:
+            timer = self._timers.pop(key, None)
+            if timer:
+                timer.cancel()
+            await self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+    async def stop(self):
+        """Write everything still buffered"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for key in list(self._pending):
+            await self._flush(key)
+
+    async def _flush_later(self, key):
+        await asyncio.sleep(self.window)
+        self._timers.pop(key, None)
+        await self._flush(key)
+
+    async def _flush(self, key):
+        messages = self._pending.pop(key, [])
+        if not messages:
+            return
+        kind, chat_id = key
+        # Telegram may deliver the same update twice
+        messages = sorted({m.id: m for m in messages}.values(), key=lambda m: m.id)
+        try:
+            if kind == "upload":
+                await self._ingest_uploads(chat_id, messages)
+            else:
+                await self._ingest_posts(kind, messages)
+        except Exception as e:
+            LOGGER(__name__).error(f"Error ingesting {len(messages)} {kind} file(s) from {chat_id}: {e}")
+            if kind == "upload":
+                await sender.send_message(self._client, chat_id, f"❌ Error: {str(e)}")
+
+    async def _ingest_posts(self, category, messages):
+        added = await db.add_files([(m.id, category, get_media_info(m)) for m in messages])
+        LOGGER(__name__).info(f"{category.capitalize()} files added: {len(added)} of {len(messages)} posts")
+        if added:
+            first = next(m for m in messages if m.id == added[0])
+            await self._reply(category, first.chat.id, added, quote=first)
+
+    async def _ingest_uploads(self, chat_id, messages):
+        forwarded = []
+        for i in range(0, len(messages), FORWARD_CHUNK_SIZE):
+            message_ids = [m.id for m in messages[i:i + FORWARD_CHUNK_SIZE]]
+            result = await sender.send(
+                CHANNEL_ID, self._client.forward_messages, CHANNEL_ID, chat_id, message_ids
+            )
+            forwarded.extend(result if isinstance(result, list) else [result])
+
+        await db.add_files([(m.id, "short", get_media_info(m)) for m in forwarded])
+        LOGGER(__name__).info(f"Direct uploads forwarded to SHORT: {[m.id for m in forwarded]}")
+        await self._reply("upload", chat_id, [m.id for m in forwarded])
+
+    async def _reply(self, kind, chat_id, file_ids, quote=None):
+        links = [f"https://t.me/{self._client.username}?start={encode(str(file_id))}" for file_id in file_ids]
+
+        if len(links) == 1:
+            reply_markup = InlineKeyboardMarkup(
+                [[InlineKeyboardButton("🔗 Share Link", url=f'https://t.me/share/url?url={links[0]}')]]
+            ) if not DISABLE_CHANNEL_BUTTON else None
+            texts = [SINGLE_TEXT[kind].format(link=links[0])]
+        else:
+            reply_markup = None
+            texts = [
+                DIGEST_TEXT[kind].format(
+                    count=len(links),
+                    links="\n".join(f"`{link}`" for link in links[i:i + DIGEST_LINES])
+                )
+                for i in range(0, len(links), DIGEST_LINES)
+            ]
+
+        for text in texts:
+            if quote:
+                await sender.send(
+                    chat_id, quote.reply_text, text=text, quote=True,
+                    disable_web_page_preview=True, reply_markup=reply_markup
+                )
+            else:
+                await sender.send_message(
+                    self._client, chat_id, text,
+                    disable_web_page_preview=True, reply_markup=reply_markup
+                )
+
+
+ingest = IngestBuffer(INGEST_WINDOW, INGEST_MAX_BATCH)
@@ -0,0 +1,109 @@
+import atexit
+import json
+import logging
+import queue
+import time
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+
+# Imported by config.py, so nothing from config can be imported here
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message (+ exc)"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(handlers, level=logging.INFO, fmt=None, datefmt=None, json_lines=False):
+    """
+    Route the root logger through a QueueHandler so the event loop only
+    enqueues records; formatting and file I/O (including rollover) happen
+    in a QueueListener thread. Returns the started listener.
+    """
+    # JSON lines keep the sortable default timestamp
+    formatter = JsonFormatter() if json_lines else logging.Formatter(fmt, datefmt)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    # Write out what is still queued when the process exits
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(records)]
+    root.setLevel(level)
+    return listener
+
+
+class RateLimitedLog:
+    """
+    At most `rate` records per second through `logger` (0 = no limit).
+    Dropped records are counted and reported with the next one let through.
+    """
+
+    def __init__(self, logger, rate):
+        self.logger = logger
+        self.rate = rate
+        self._window = 0
+        self._count = 0
+        self._dropped = 0
+
+    def log(self, level, message):
+        if not self.logger.isEnabledFor(level):
+            return
+        if self.rate:
+            now = time.monotonic()
+            if now - self._window >= 1:
+                self._window, self._count = now, 0
+            if self._count >= self.rate:
+                self._dropped += 1
+                return
+            self._count += 1
+        if self._dropped:
+            message = f"{message} (+{self._dropped} similar not logged)"
+            self._dropped = 0
+        self.logger.log(level, message)
+
+    def info(self, message):
+        self.log(logging.INFO, message)
+
+    def warning(self, message):
+        self.log(logging.WARNING, message)
+
+
+class ErrorSummary:
+    """
+    Errors of one job (a broadcast, a batch, an auto-delete round) counted
+    by type: the first of each type is logged in full, flush() logs one
+    "UserIsBlocked x 812" style line for the whole job.
+    """
+
+    def __init__(self, logger, context):
+        self.logger = logger
+        self.context = context
+        self.counts = Counter()
+
+    def add(self, error, detail=None, quiet=False):
+        """Count an error; quiet errors (expected ones) only show up in the summary"""
+        name = type(error).__name__
+        self.counts[name] += 1
+        if self.counts[name] == 1 and not quiet:
+            self.logger.error(f"{self.context}{f' ({detail})' if detail else ''}: {name}: {error}")
+
+    def flush(self):
+        if self.counts:
+            summary = ", ".join(f"{name} x {count}" for name, count in self.counts.most_common())
+            self.logger.warning(f"{self.context} errors: {summary}")
+            self.counts.clear()
@@ -0,0 +1,234 @@
+import asyncio
+import functools
+import inspect
+import time
+from collections import defaultdict
+from pyrogram.errors import FloodWait
+from config import METRICS_HOST, METRICS_PORT, LOGGER
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = defaultdict(float)
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] += amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._counts = defaultdict(lambda: [0] * len(self.buckets))
+        self._sums = defaultdict(float)
+        self._totals = defaultdict(int)
+
+    def observe(self, value, *labels):
+        counts = self._counts[labels]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self._sums[labels] += value
+        self._totals[labels] += 1
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, counts in self._counts.items():
+            for bound, count in zip(self.buckets, counts):
+                bucket_labels = _labels(self.labelnames + ("le",), labels + (bound,))
+                yield f"{self.name}_bucket{bucket_labels} {count}"
+            inf_labels = _labels(self.labelnames + ("le",), labels + ("+Inf",))
+            yield f"{self.name}_bucket{inf_labels} {self._totals[labels]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {self._sums[labels]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {self._totals[labels]}"
+
+
+class Gauge:
+    """Gauge read from a (sync or async) callback at scrape time"""
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.value = 0
+
+    async def refresh(self):
+        try:
+            value = self.callback()
+            if inspect.isawaitable(value):
+                value = await value
+            self.value = value
+        except Exception as e:
+            LOGGER(__name__).warning(f"Could not read gauge {self.name}: {e}")
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {self.value}"
+
+
+class Metrics:
+    """
+    Process-wide metrics in Prometheus text format, served on
+    http://METRICS_HOST:METRICS_PORT/metrics when METRICS_PORT is set.
+    """
+
+    def __init__(self):
+        self.handler_seconds = Histogram(
+            "filebot_handler_seconds", "Handler latency", ("handler",))
+        self.handler_errors = Counter(
+            "filebot_handler_errors_total", "Handler exceptions", ("handler", "error"))
+        self.db_seconds = Histogram(
+            "filebot_db_seconds", "Database method latency", ("method",))
+        self.db_errors = Counter(
+            "filebot_db_errors_total", "Database method errors", ("method", "error"))
+        self.telegram_seconds = Histogram(
+            "filebot_telegram_seconds", "Telegram API call latency", ("method",))
+        self.telegram_errors = Counter(
+            "filebot_telegram_errors_total", "Telegram API errors", ("method", "error"))
+        self.flood_waits = Counter(
+            "filebot_flood_waits_total", "FloodWait errors received", ("method",))
+        self.flood_wait_seconds = Counter(
+            "filebot_flood_wait_seconds_total", "Seconds Telegram asked us to wait", ("method",))
+        self.send_wait_seconds = Histogram(
+            "filebot_send_wait_seconds", "Time queued for the global send budget", ("lane",))
+        self._collectors = [
+            self.handler_seconds, self.handler_errors, self.db_seconds, self.db_errors,
+            self.telegram_seconds, self.telegram_errors, self.flood_waits, self.flood_wait_seconds,
+            self.send_wait_seconds
+        ]
+        self._gauges = []
+        self._server = None
+
+    def gauge(self, name, documentation, callback):
+        gauge = Gauge(name, documentation, callback)
+        self._gauges.append(gauge)
+        return gauge
+
+    def timed(self, handler):
+        """Decorator recording latency and errors of an async handler"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    self.handler_errors.inc(handler, type(e).__name__)
+                    raise
+                finally:
+                    self.handler_seconds.observe(time.perf_counter() - started, handler)
+            return wrapper
+        return decorator
+
+    def instrument_class(self, cls, exclude=()):
+        """Wrap every public coroutine method of cls with database timing"""
+        for name, func in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude or not inspect.iscoroutinefunction(func):
+                continue
+            setattr(cls, name, self._timed_db(name, func))
+        return cls
+
+    def _timed_db(self, method, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                self.db_errors.inc(method, type(e).__name__)
+                raise
+            finally:
+                self.db_seconds.observe(time.perf_counter() - started, method)
+        return wrapper
+
+    async def track_api(self, invoke, query, *args, **kwargs):
+        """
+        Time a raw Telegram API call (used by Client.invoke).
+
+        Clients run with sleep_threshold=0, so every FloodWait is counted
+        here, short ones included. The time spent waiting it out (by the
+        Sender or Bot.invoke) is not part of the call's latency.
+        """
+        method = type(query).__name__
+        started = time.perf_counter()
+        try:
+            return await invoke(query, *args, **kwargs)
+        except FloodWait as e:
+            self.flood_waits.inc(method)
+            self.flood_wait_seconds.inc(method, amount=e.value)
+            self.telegram_errors.inc(method, "FloodWait")
+            raise
+        except Exception as e:
+            self.telegram_errors.inc(method, type(e).__name__)
+            raise
+        finally:
+            self.telegram_seconds.observe(time.perf_counter() - started, method)
+
+    async def render(self):
+        for gauge in self._gauges:
+            await gauge.refresh()
+        lines = []
+        for collector in self._collectors + self._gauges:
+            lines.extend(collector.collect())
+        return "\n".join(lines) + "\n"
+
+    async def start(self):
+        if not METRICS_PORT or self._server:
+            return
+        self._server = await asyncio.start_server(self._handle, METRICS_HOST, METRICS_PORT)
+        LOGGER(__name__).info(f"Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1")
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = (await self.render()).encode()
+                status = "200 OK"
+            else:
+                body = b"Not Found\n"
+                status = "404 Not Found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            LOGGER(__name__).warning(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+
+metrics = Metrics()
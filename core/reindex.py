@@ -0,0 +1,110 @@
+import asyncio
+from pyrogram.errors import FloodWait
+from database.database import db
+from helper_func import get_media_info
+from config import CHANNEL_ID, MOVIE_CHANNEL_ID, LOGGER
+
+# get_messages accepts at most 200 message IDs per call
+CHUNK_SIZE = 200
+# Consecutive chunks without any message before the scan assumes it reached the end
+# (only once it is past the highest stored file)
+EMPTY_CHUNKS_TO_STOP = 3
+
+
+class ChannelIndexer:
+    """
+    Backfill of DB channel posts that never reached `files` (posted while
+    the bot was offline).
+
+    A scan walks message IDs upwards in CHUNK_SIZE steps from where the
+    last one ended (or the highest indexed file), bulk-upserts the media
+    posts and stores a checkpoint in `checkpoints` after every chunk, so a
+    long history can be processed over several runs. Existing files are
+    left untouched. It always runs up to the highest stored file, so runs
+    of deleted posts below the ones ingest has seen do not end it early.
+    """
+
+    def __init__(self):
+        self._locks = {}
+
+    def channels(self, client):
+        """(category, channel_id) pairs this bot can index"""
+        channels = [("short", CHANNEL_ID)]
+        if getattr(client, "movie_channel", None):
+            channels.append(("movie", MOVIE_CHANNEL_ID))
+        return channels
+
+    def running(self, channel_id):
+        lock = self._locks.get(channel_id)
+        return bool(lock and lock.locked())
+
+    async def catch_up(self, client, progress=None):
+        """Scan every DB channel; returns {category: (scanned, added)}"""
+        results = {}
+        for category, channel_id in self.channels(client):
+            results[category] = await self.scan(client, category, channel_id, progress=progress)
+        return results
+
+    async def scan(self, client, category, channel_id, from_id=None, progress=None):
+        """
+        Index channel_id starting at from_id (default: resume the checkpoint,
+        or continue after the highest stored file when there is none).
+        progress(category, next_id, scanned, added) is awaited after each chunk.
+        Returns (IDs scanned, files added).
+        """
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            key = f"reindex:{channel_id}"
+            checkpoint = await db.get_checkpoint(key) or {}
+            max_id = await db.get_max_file_id(category) or 0
+            if from_id is None:
+                from_id = checkpoint["next_id"] if checkpoint else max_id + 1
+
+            skip = set(await db.get_broadcast_stash_ids()) if channel_id == CHANNEL_ID else set()
+            next_id = from_id
+            last_seen = checkpoint.get("last_seen", from_id - 1)
+            scanned = added = empty_chunks = 0
+
+            while empty_chunks < EMPTY_CHUNKS_TO_STOP or next_id <= max_id:
+                message_ids = list(range(next_id, next_id + CHUNK_SIZE))
+                messages = [m for m in await self._fetch(client, channel_id, message_ids) if not m.empty]
+                next_id += CHUNK_SIZE
+                scanned += CHUNK_SIZE
+
+                if not messages:
+                    empty_chunks += 1
+                    continue
+                empty_chunks = 0
+                last_seen = max(last_seen, *(m.id for m in messages))
+
+                files = []
+                for message in messages:
+                    media = get_media_info(message)
+                    if media and message.id not in skip:
+                        files.append((message.id, category, media))
+                if files:
+                    added += len(await db.add_files(files))
+
+                await db.save_checkpoint(key, {"next_id": next_id, "last_seen": last_seen, "done": False})
+                if progress:
+                    await progress(category, next_id, scanned, added)
+
+            # Trailing empty chunks may just be IDs not used yet; continue after the last post next time
+            await db.save_checkpoint(key, {"next_id": last_seen + 1, "last_seen": last_seen, "done": True})
+            LOGGER(__name__).info(
+                f"Reindexed {category} channel from message {from_id}: {added} new file(s), last post {last_seen}; "
+                f"stopped at {next_id} after {EMPTY_CHUNKS_TO_STOP * CHUNK_SIZE} empty IDs "
+                f"(posts after a longer gap need /reindex {category} <from_id>)"
+            )
+            return scanned, added
+
+    async def _fetch(self, client, channel_id, message_ids):
+        while True:
+            try:
+                return await client.get_messages(channel_id, message_ids)
+            except FloodWait as e:
+                LOGGER(__name__).warning(f"Reindex waiting {e.value}s (FloodWait)")
+                await asyncio.sleep(e.value)
+
+
+indexer = ChannelIndexer()
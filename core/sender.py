@@ -0,0 +1,247 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import contextmanager
+from pyrogram.errors import FloodWait
+from core.metrics import metrics
+from config import (
+    GLOBAL_SEND_RATE, CHAT_SEND_RATE, GROUP_SEND_RATE, CHAT_SEND_BURST, SEND_LANE_WEIGHTS, LOGGER
+)
+
+# FloodWaits from this many different chats within FLOOD_WINDOW seconds pause everything
+GLOBAL_FLOOD_CHATS = 3
+FLOOD_WINDOW = 5
+# Global slots that may go out back-to-back; a full bucket plus the refill must
+# stay under Telegram's ~30 msg/s within any second
+GLOBAL_BURST = 2
+# Idle per-chat buckets are dropped once this many are tracked
+MAX_CHAT_BUCKETS = 10000
+
+# Priority lanes for the global budget, highest first
+INTERACTIVE, BATCH, BULK = 0, 1, 2
+LANE_NAMES = ("interactive", "batch", "bulk")
+
+# Lane of the sends made by the current task (set with Sender.lane)
+current_lane = contextvars.ContextVar("send_lane", default=INTERACTIVE)
+# True while a Sender is running an API call, whose FloodWaits it handles itself
+sending = contextvars.ContextVar("sending", default=False)
+
+
+class TokenBucket:
+    """Rate limiter handing out reservations: reserve() returns how long to wait"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, count=1):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= count
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def wait(self, count=1):
+        """
+        How long reserve(count) would wait right now, without taking a token.
+        A count above the burst only waits for a full bucket and leaves it in
+        debt, so the sends after it wait for the rest.
+        """
+        need = min(count, self.burst)
+        tokens = min(self.burst, self.tokens + (time.monotonic() - self.updated) * self.rate)
+        return 0 if tokens >= need else (need - tokens) / self.rate
+
+
+class Sender:
+    """
+    Central scheduler for outgoing copy / forward / send_message / delete_messages.
+
+    Every call waits for a slot in the per-chat budget and in the global
+    messages-per-second budget. A FloodWait pauses only the affected chat
+    (or everything, when several chats are flooded at once) and the call
+    is replayed afterwards instead of failing.
+
+    When the global budget is contended, slots go to the waiting lanes
+    (interactive, batch, bulk) by smooth weighted round-robin over
+    SEND_LANE_WEIGHTS: each busy lane gets at least its share, and a lane
+    with nothing queued leaves its share to the others.
+    """
+
+    def __init__(self, global_rate, chat_rate, group_rate, chat_burst, weights=SEND_LANE_WEIGHTS):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.weights = weights
+        self._global = TokenBucket(global_rate, GLOBAL_BURST)
+        self._waiting = [deque() for _ in LANE_NAMES]
+        self._credit = [0] * len(LANE_NAMES)
+        self._pump = None
+        self._chats = {}
+        self._global_paused_until = 0
+        self._chat_paused_until = {}
+        self._recent_floods = {}
+
+    async def send(self, chat_id, func, *args, cost=1, **kwargs):
+        """
+        Run an outgoing API call for chat_id within the rate budgets.
+        `cost` is the number of messages it puts in the chat (an album's items).
+        """
+        while True:
+            await self._acquire(chat_id, cost)
+            token = sending.set(True)
+            try:
+                return await func(*args, **kwargs)
+            except FloodWait as e:
+                self._on_flood_wait(chat_id, e.value)
+            finally:
+                sending.reset(token)
+
+    async def try_send(self, chat_id, func, *args, cost=1, **kwargs):
+        """Like send(), but a FloodWait is recorded and re-raised so the caller can fail over"""
+        await self._acquire(chat_id, cost)
+        token = sending.set(True)
+        try:
+            return await func(*args, **kwargs)
+        except FloodWait as e:
+            self._on_flood_wait(chat_id, e.value)
+            raise
+        finally:
+            sending.reset(token)
+
+    def backlog(self, chat_id=None):
+        """Seconds a new send (to chat_id, if given) would currently wait"""
+        now = time.monotonic()
+        paused_until = max(self._global_paused_until, self._chat_paused_until.get(chat_id, 0))
+        queued = sum(cost for queue in self._waiting for _, cost in queue) / self._global.rate
+        return max(self._global.wait() + queued, paused_until - now, 0)
+
+    @contextmanager
+    def lane(self, lane):
+        """Send everything in this block (and tasks started from it) in the given lane"""
+        token = current_lane.set(lane)
+        try:
+            yield
+        finally:
+            current_lane.reset(token)
+
+    async def copy(self, message, chat_id, **kwargs):
+        return await self.send(chat_id, message.copy, chat_id, **kwargs)
+
+    async def forward(self, message, chat_id, **kwargs):
+        return await self.send(chat_id, message.forward, chat_id, **kwargs)
+
+    async def send_message(self, client, chat_id, text, **kwargs):
+        return await self.send(chat_id, client.send_message, chat_id, text, **kwargs)
+
+    async def delete_messages(self, client, chat_id, message_ids, **kwargs):
+        return await self.send(chat_id, client.delete_messages, chat_id, message_ids, **kwargs)
+
+    async def _acquire(self, chat_id, cost=1):
+        # Wait out pauses first, then the chat slot, then the global slot
+        while True:
+            now = time.monotonic()
+            paused_until = max(self._global_paused_until, self._chat_paused_until.get(chat_id, 0))
+            if paused_until <= now:
+                break
+            await asyncio.sleep(paused_until - now)
+
+        delay = self._chat_bucket(chat_id).reserve(cost)
+        if delay:
+            await asyncio.sleep(delay)
+        await self._global_slot(current_lane.get(), cost)
+
+    async def _global_slot(self, lane, cost=1):
+        if not any(self._waiting) and not self._global.wait(cost):
+            self._global.reserve(cost)
+            return
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[lane].append((future, cost))
+        if self._pump is None:
+            self._pump = asyncio.create_task(self._grant())
+        await future
+        metrics.send_wait_seconds.observe(time.monotonic() - started, LANE_NAMES[lane])
+
+    async def _grant(self):
+        # Hands out global slots as they free up while anyone is queued. A lane
+        # picked for an album keeps the slot until the album's tokens are in.
+        lane = None
+        try:
+            while True:
+                for queue in self._waiting:
+                    while queue and queue[0][0].done():  # cancelled waiters
+                        queue.popleft()
+                busy = [i for i, queue in enumerate(self._waiting) if queue]
+                if not busy:
+                    return
+                if lane not in busy:
+                    delay = self._global.wait()
+                    if delay:
+                        await asyncio.sleep(delay)
+                        continue
+                    lane = self._next_lane(busy)
+                future, cost = self._waiting[lane][0]
+                delay = self._global.wait(cost)
+                if delay:
+                    await asyncio.sleep(delay)
+                    continue
+                self._global.reserve(cost)
+                self._waiting[lane].popleft()
+                future.set_result(None)
+                lane = None
+        finally:
+            self._pump = None
+
+    def _next_lane(self, busy):
+        # Smooth weighted round-robin over the lanes that have waiters
+        total = 0
+        for lane in busy:
+            self._credit[lane] += self.weights[lane]
+            total += self.weights[lane]
+        chosen = max(busy, key=lambda lane: (self._credit[lane], -lane))
+        self._credit[chosen] -= total
+        for lane in range(len(LANE_NAMES)):
+            if lane not in busy:
+                self._credit[lane] = 0
+        return chosen
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                self._prune()
+            # Groups and channels have a much lower per-chat limit than private chats
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def _prune(self):
+        now = time.monotonic()
+        self._chats = {
+            chat_id: bucket for chat_id, bucket in self._chats.items()
+            if now - bucket.updated < bucket.burst / bucket.rate
+        }
+        self._chat_paused_until = {
+            chat_id: until for chat_id, until in self._chat_paused_until.items() if until > now
+        }
+
+    def _on_flood_wait(self, chat_id, seconds):
+        now = time.monotonic()
+        until = now + seconds
+        self._chat_paused_until[chat_id] = max(self._chat_paused_until.get(chat_id, 0), until)
+
+        self._recent_floods = {
+            cid: ts for cid, ts in self._recent_floods.items() if now - ts < FLOOD_WINDOW
+        }
+        self._recent_floods[chat_id] = now
+        if len(self._recent_floods) >= GLOBAL_FLOOD_CHATS:
+            self._global_paused_until = max(self._global_paused_until, until)
+            LOGGER(__name__).warning(f"FloodWait across {len(self._recent_floods)} chats, pausing all sends for {seconds}s")
+        else:
+            LOGGER(__name__).warning(f"FloodWait for chat {chat_id}, pausing it for {seconds}s")
+
+
+sender = Sender(GLOBAL_SEND_RATE, CHAT_SEND_RATE, GROUP_SEND_RATE, CHAT_SEND_BURST)
@@ -1,5 +1,61 @@
+import asyncio
+import secrets
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 import motor.motor_asyncio
-from config import DATABASE_URL, DATABASE_NAME, LOGGER
+from pymongo import IndexModel, UpdateOne, ReturnDocument
+from pymongo.errors import OperationFailure
+from config import (
+    DATABASE_URL, DATABASE_NAME, AUTO_DELETE_TIME, SETTINGS_POLL_INTERVAL,
+    USER_FLUSH_INTERVAL, USER_FLUSH_SIZE, LAST_SEEN_INTERVAL,
+    FILE_CACHE_SIZE, FILE_CACHE_TTL, LOGGER
+)
+from core.cache import TTLCache, SingleFlight
+from core.metrics import metrics
+
+# Settings document bumped on every write so other replicas can poll for changes
+SETTINGS_VERSION_KEY = "_version"
+# Secondary indexes per collection, created and verified by ensure_indexes() at startup
+INDEXES = {
+    "files": [
+        IndexModel([("category", 1), ("_id", 1)]),        # batch range resolution
+        IndexModel([("ingested_at", -1)]),
+        IndexModel([("file_unique_id", 1)], sparse=True),  # duplicate detection
+        IndexModel([("hits", -1)], partialFilterExpression={"hits": {"$gt": 0}}),  # cache warm-up
+        IndexModel([("media_group_id", 1)], sparse=True),  # album lookup
+    ],
+    "users": [IndexModel([("last_seen", -1)])],
+    "auto_delete": [IndexModel([("delete_at", 1)])],
+    "broadcasts": [IndexModel([("status", 1)])],
+    "conversations": [IndexModel([("expires_at", 1)], expireAfterSeconds=0)],  # MongoDB drops expired flows
+}
+
+# Telegram albums hold at most 10 items
+MEDIA_GROUP_LIMIT = 10
+# Fields read back for delivery (hits, file_ref and ingested_at are write-only)
+FILE_PROJECTION = {
+    field: 1 for field in (
+        "category", "media_type", "file_id", "file_unique_id",
+        "file_name", "file_size", "caption", "has_buttons", "media_group_id"
+    )
+}
+BROADCAST_PROJECTION = {
+    field: 1 for field in (
+        "mode", "from_chat_id", "message_id", "admin_id", "status_chat_id", "status_message_id",
+        "last_user_id", "total", "counters", "dead_users", "stash_message_id"
+    )
+}
+
+# Materialized counters in the stats collection; daily rollups are "daily:YYYY-MM-DD"
+STATS_TOTALS_KEY = "totals"
+STATS_DAILY_PREFIX = "daily:"
+
+# Which helper bots each user has started (see core/helpers.py)
+HELPER_USERS_CACHE_SIZE = 100000
+HELPER_USERS_CACHE_TTL = 600
 
 class Database:
     def __init__(self, uri, database_name):
@@ -8,53 +64,410 @@ class Database:
         self.users = self.db.users
         self.files = self.db.files
         self.settings = self.db.settings
+        self.auto_delete = self.db.auto_delete
+        self.channels = self.db.channels
+        self.broadcasts = self.db.broadcasts
+        self.helper_users = self.db.helper_users
+        self.batches = self.db.batches
+        self.stats = self.db.stats
+        self.checkpoints = self.db.checkpoints
+        self.conversations = self.db.conversations
+        # In-memory copy of the settings collection, replaced as a whole on change
+        self._settings = None
+        self._settings_version = None
+        # Sorted IDs of registered users (8 bytes each) and write-behind buffer
+        self._known_users = array("q")
+        self._pending_users = {}
+        self._last_seen = {}
+        # Hot file records and request counts (flushed as "hits" for warm-up)
+        self._file_cache = TTLCache(FILE_CACHE_SIZE, FILE_CACHE_TTL)
+        self._file_hits = Counter()
+        # Batch manifests never change after creation
+        self._batch_cache = TTLCache(FILE_CACHE_SIZE, FILE_CACHE_TTL)
+        self._group_cache = TTLCache(FILE_CACHE_SIZE, FILE_CACHE_TTL)
+        self._helper_bots = TTLCache(HELPER_USERS_CACHE_SIZE, HELPER_USERS_CACHE_TTL)
+        # Cache misses for the same file or batch share one query
+        self._lookups = SingleFlight()
+
+    async def ping(self):
+        """First round trip to the server (the client itself connects lazily)"""
+        await self._client.admin.command("ping")
+
+    async def ensure_indexes(self):
+        """Create the secondary indexes in INDEXES and log any that are missing afterwards"""
+        for name, indexes in INDEXES.items():
+            collection = getattr(self, name)
+            try:
+                await collection.create_indexes(indexes)
+                existing = await collection.index_information()
+            except OperationFailure as e:
+                LOGGER(__name__).error(f"Could not create indexes on {name}: {e}")
+                continue
+            missing = [index.document["name"] for index in indexes if index.document["name"] not in existing]
+            if missing:
+                LOGGER(__name__).error(f"Missing indexes on {name}: {', '.join(missing)}")
+        LOGGER(__name__).info(f"Indexes verified on {len(INDEXES)} collections")
+
+    async def load_users(self):
+        user_ids = array("q")
+        async for user in self.users.find({}, {"_id": 1}).batch_size(10000):
+            user_ids.append(user["_id"])
+        self._known_users = array("q", sorted(user_ids))
+        LOGGER(__name__).info(f"Loaded {len(self._known_users)} known users")
+
+    def _is_known_user(self, user_id):
+        idx = bisect_left(self._known_users, user_id)
+        return idx < len(self._known_users) and self._known_users[idx] == user_id
 
     async def add_user(self, user_id, first_name=None, username=None):
-        user = await self.users.find_one({"_id": user_id})
-        if not user:
-            await self.users.insert_one({
-                "_id": user_id,
-                "first_name": first_name,
-                "username": username
-            })
+        """Buffer a registration / last_seen update; written by flush_users()"""
+        now = time.monotonic()
+        if self._is_known_user(user_id) and now - self._last_seen.get(user_id, 0) < LAST_SEEN_INTERVAL:
+            return
+        self._last_seen[user_id] = now
+        self._pending_users[user_id] = {
+            "first_name": first_name,
+            "username": username,
+            "last_seen": datetime.now(timezone.utc)
+        }
+        if len(self._pending_users) >= USER_FLUSH_SIZE:
+            asyncio.create_task(self.flush_users())
+
+    async def flush_users(self):
+        if not self._pending_users:
+            return
+        pending, self._pending_users = self._pending_users, {}
+        try:
+            result = await self.users.bulk_write([
+                UpdateOne(
+                    {"_id": user_id},
+                    {
+                        "$set": {"last_seen": user["last_seen"]},
+                        "$setOnInsert": {
+                            "first_name": user["first_name"],
+                            "username": user["username"],
+                            "joined": user["last_seen"]
+                        }
+                    },
+                    upsert=True
+                )
+                for user_id, user in pending.items()
+            ], ordered=False)
+        except Exception as e:
+            LOGGER(__name__).error(f"Error flushing {len(pending)} users: {e}")
+            # Keep newer entries buffered since the failed flush
+            self._pending_users = {**pending, **self._pending_users}
+            return
+        for user_id in pending:
+            if not self._is_known_user(user_id):
+                insort(self._known_users, user_id)
+        if result.upserted_count:
+            await self._inc_stats({"users": result.upserted_count}, {"new_users": result.upserted_count})
+        # Entries older than the throttle window no longer suppress anything
+        cutoff = time.monotonic() - LAST_SEEN_INTERVAL
+        self._last_seen = {uid: ts for uid, ts in self._last_seen.items() if ts > cutoff}
+
+    async def run_flusher(self):
+        """Periodically write buffered users and file hit counts"""
+        while True:
+            await asyncio.sleep(USER_FLUSH_INTERVAL)
+            await self.flush_users()
+            await self.flush_file_hits()
 
     async def is_user_exist(self, user_id):
-        user = await self.users.find_one({'_id': user_id})
+        if self._is_known_user(user_id) or user_id in self._pending_users:
+            return True
+        user = await self.users.find_one({'_id': user_id}, {"_id": 1})
         return bool(user)
 
     async def total_users_count(self):
-        return await self.users.count_documents({})
+        # Collection metadata instead of a full scan; exact counts are not needed for stats
+        return await self.users.estimated_document_count()
 
     async def get_all_users(self):
-        return self.users.find({})
+        return self.users.find({}, {"_id": 1}).batch_size(1000)
 
     async def delete_user(self, user_id):
-        await self.users.delete_one({'_id': user_id})
+        self._pending_users.pop(user_id, None)
+        idx = bisect_left(self._known_users, user_id)
+        if idx < len(self._known_users) and self._known_users[idx] == user_id:
+            del self._known_users[idx]
+        result = await self.users.delete_one({'_id': user_id})
+        if result.deleted_count:
+            await self._inc_stats({"users": -1})
 
-    async def add_file(self, file_id, file_ref, category="short"):
-        await self.files.insert_one({
-            "_id": file_id,
-            "file_ref": file_ref,
-            "category": category
-        })
+    async def get_user_ids_after(self, last_user_id, limit):
+        """Next page of user IDs in _id order, for resumable scans"""
+        query = {"_id": {"$gt": last_user_id}} if last_user_id is not None else {}
+        cursor = self.users.find(query, {"_id": 1}).sort("_id", 1).limit(limit).batch_size(limit)
+        return [user["_id"] async for user in cursor]
+
+    async def delete_users(self, user_ids):
+        user_ids = set(user_ids)
+        for user_id in user_ids:
+            self._pending_users.pop(user_id, None)
+        self._known_users = array("q", (uid for uid in self._known_users if uid not in user_ids))
+        result = await self.users.delete_many({"_id": {"$in": list(user_ids)}})
+        if result.deleted_count:
+            await self._inc_stats({"users": -result.deleted_count})
+
+    async def create_broadcast(self, job):
+        result = await self.broadcasts.insert_one(job)
+        return result.inserted_id
+
+    async def get_running_broadcasts(self):
+        return await self.broadcasts.find({"status": "running"}, BROADCAST_PROJECTION).to_list(length=None)
+
+    async def get_broadcast_stash_ids(self):
+        """Channel posts staged by running broadcasts (not files)"""
+        cursor = self.broadcasts.find(
+            {"status": "running", "stash_message_id": {"$exists": True}}, {"stash_message_id": 1}
+        )
+        return [job["stash_message_id"] async for job in cursor]
+
+    async def update_broadcast(self, job_id, fields):
+        await self.broadcasts.update_one({"_id": job_id}, {"$set": fields})
+
+    async def checkpoint_broadcast(self, job_id, last_user_id, counters, dead_users):
+        """Save progress of a running job; returns False if it is no longer running"""
+        result = await self.broadcasts.update_one(
+            {"_id": job_id, "status": "running"},
+            {
+                "$set": {"last_user_id": last_user_id, "counters": counters},
+                "$push": {"dead_users": {"$each": dead_users}}
+            }
+        )
+        return result.matched_count > 0
+
+    async def add_file(self, file_id, file_ref, category="short", media=None):
+        return bool(await self.add_files([(file_id, category, media)]))
+
+    async def add_files(self, files):
+        """
+        Store (file_id, category, media) entries with one unordered bulk upsert.
+        Files that already exist are left untouched, so replayed posts are no-ops.
+        Returns the IDs of the files that were new.
+        """
+        now = datetime.now(timezone.utc)
+        result = await self.files.bulk_write([
+            UpdateOne(
+                {"_id": file_id},
+                {"$setOnInsert": {
+                    "file_ref": file_id,
+                    "category": category,
+                    "ingested_at": now,
+                    **(media or {})
+                }},
+                upsert=True
+            )
+            for file_id, category, media in files
+        ], ordered=False)
+
+        totals = Counter()
+        added = []
+        for index in sorted(result.upserted_ids):
+            file_id, category, media = files[index]
+            added.append(file_id)
+            self._file_cache.pop(file_id)
+            size = (media or {}).get("file_size") or 0
+            totals.update({"files": 1, f"files_{category}": 1, "bytes": size})
+        if totals:
+            await self._inc_stats(dict(totals), {"new_files": totals["files"], "new_bytes": totals["bytes"]})
+        return added
+
+    async def update_file_media(self, file_id, media):
+        # Requests that fetched the same post concurrently store the refresh once
+        await self._lookups.do(("media", file_id, media["file_id"]), self._set_file_media, file_id, media)
+
+    async def _set_file_media(self, file_id, media):
+        await self.files.update_one({"_id": file_id}, {"$set": media})
+        self._file_cache.pop(file_id)
 
     async def get_file(self, file_id):
-        file = await self.files.find_one({"_id": file_id})
+        self._file_hits[file_id] += 1
+        file = self._file_cache.get(file_id)
+        if file is None:
+            file = await self._lookups.do(("file", file_id), self._load_file, file_id)
         return file
 
+    async def _load_file(self, file_id):
+        file = await self.files.find_one({"_id": file_id}, FILE_PROJECTION)
+        if file:
+            self._file_cache.set(file_id, file)
+        return file
+
+    async def get_files(self, file_ids):
+        """Return {file_id: file} for the given IDs that exist, using one query"""
+        files = {}
+        missing = []
+        for file_id in file_ids:
+            file = self._file_cache.get(file_id)
+            if file is None:
+                missing.append(file_id)
+            else:
+                files[file_id] = file
+        if missing:
+            cursor = self.files.find({"_id": {"$in": missing}}, FILE_PROJECTION).batch_size(len(missing))
+            async for file in cursor:
+                files[file["_id"]] = file
+                self._file_cache.set(file["_id"], file)
+        return files
+
+    async def get_media_group(self, file):
+        """Files of the album `file` belongs to, in post order ([file] if it is not in one)"""
+        group_id = file.get("media_group_id")
+        if not group_id:
+            return [file]
+        file_ids = self._group_cache.get(group_id)
+        if file_ids is None:
+            cursor = self.files.find(
+                {"media_group_id": group_id, "category": file.get("category", "short")}, {"_id": 1}
+            ).sort("_id", 1).limit(MEDIA_GROUP_LIMIT)
+            file_ids = [f["_id"] async for f in cursor]
+            self._group_cache.set(group_id, file_ids)
+        files = await self.get_files(file_ids)
+        return [files[file_id] for file_id in file_ids if file_id in files] or [file]
+
+    async def get_file_ids_in_range(self, first_id, last_id, category, limit):
+        """Sorted IDs of stored files of a category between first_id and last_id (at most limit)"""
+        cursor = self.files.find(
+            {"_id": {"$gte": first_id, "$lte": last_id}, "category": category}, {"_id": 1}
+        ).sort("_id", 1).limit(limit).batch_size(limit)
+        return [file["_id"] async for file in cursor]
+
+    async def get_max_file_id(self, category):
+        """Highest stored message ID of a category, or None"""
+        cursor = self.files.find({"category": category}, {"_id": 1}).sort("_id", -1).limit(1)
+        files = await cursor.to_list(length=1)
+        return files[0]["_id"] if files else None
+
+    async def create_batch(self, channel_id, file_ids, created_by):
+        """Store a batch manifest (ordered file IDs of one channel); returns its ID"""
+        batch = {
+            "_id": secrets.token_hex(6),
+            "channel_id": channel_id,
+            "file_ids": list(file_ids),
+            "created_by": created_by,
+            "created_at": datetime.now(timezone.utc)
+        }
+        await self.batches.insert_one(batch)
+        return batch["_id"]
+
+    async def get_batch(self, batch_id):
+        batch = self._batch_cache.get(batch_id)
+        if batch is None:
+            batch = await self._lookups.do(("batch", batch_id), self._load_batch, batch_id)
+        return batch
+
+    async def _load_batch(self, batch_id):
+        batch = await self.batches.find_one({"_id": batch_id}, {"channel_id": 1, "file_ids": 1})
+        if batch:
+            self._batch_cache.set(batch_id, batch)
+        return batch
+
     async def is_file_exist(self, file_id):
-        file = await self.files.find_one({'_id': file_id})
+        file = await self.files.find_one({'_id': file_id}, {"_id": 1})
         return bool(file)
 
-    async def delete_file(self, file_id):
-        await self.files.delete_one({'_id': file_id})
+    async def delete_file(self, file_id, category=None):
+        """Remove a file (only if it has this category, when given); True if it existed"""
+        self._file_cache.pop(file_id)
+        query = {'_id': file_id}
+        if category:
+            query["category"] = category
+        file = await self.files.find_one_and_delete(
+            query, projection={"category": 1, "file_size": 1, "media_group_id": 1}
+        )
+        if not file:
+            return False
+        if file.get("media_group_id"):
+            self._group_cache.pop(file["media_group_id"])
+        await self._inc_stats({
+            "files": -1,
+            f"files_{file.get('category', 'short')}": -1,
+            "bytes": -(file.get("file_size") or 0)
+        })
+        return True
+
+    async def flush_file_hits(self):
+        if not self._file_hits:
+            return
+        hits, self._file_hits = self._file_hits, Counter()
+        try:
+            await self.files.bulk_write([
+                UpdateOne({"_id": file_id}, {"$inc": {"hits": count}})
+                for file_id, count in hits.items()
+            ], ordered=False)
+        except Exception as e:
+            LOGGER(__name__).error(f"Error flushing file hits: {e}")
+            self._file_hits.update(hits)
+
+    async def warm_file_cache(self, limit):
+        """Preload the most requested files so a restart starts with a hot cache"""
+        cursor = self.files.find({"hits": {"$gt": 0}}, FILE_PROJECTION).sort("hits", -1).limit(limit).batch_size(limit)
+        async for file in cursor:
+            self._file_cache.set(file["_id"], file)
+        LOGGER(__name__).info(f"File cache warmed with {len(self._file_cache)} files")
 
     async def total_files_count(self):
-        return await self.files.count_documents({})
+        return await self.files.estimated_document_count()
+
+    async def _inc_stats(self, totals, daily=None):
+        """Apply counter increments to the totals document and today's rollup"""
+        requests = [UpdateOne({"_id": STATS_TOTALS_KEY}, {"$inc": totals}, upsert=True)]
+        if daily:
+            day = datetime.now(timezone.utc).date().isoformat()
+            requests.append(UpdateOne(
+                {"_id": f"{STATS_DAILY_PREFIX}{day}"},
+                {"$inc": daily, "$setOnInsert": {"date": day}},
+                upsert=True
+            ))
+        try:
+            await self.stats.bulk_write(requests, ordered=False)
+        except Exception as e:
+            # Counters can always be recomputed with rebuild_stats()
+            LOGGER(__name__).error(f"Error updating stats: {e}")
+
+    async def get_stats(self, days=7):
+        """Totals and the last `days` daily rollups (oldest first) in one query"""
+        today = datetime.now(timezone.utc).date()
+        keys = [f"{STATS_DAILY_PREFIX}{(today - timedelta(days=i)).isoformat()}" for i in range(days)]
+        docs = {}
+        async for doc in self.stats.find({"_id": {"$in": [STATS_TOTALS_KEY, *keys]}}):
+            docs[doc["_id"]] = doc
+        totals = docs.get(STATS_TOTALS_KEY)
+        if totals is None:
+            totals = await self.rebuild_stats()
+        daily = [(key[len(STATS_DAILY_PREFIX):], docs.get(key, {})) for key in reversed(keys)]
+        return totals, daily
+
+    async def ensure_stats(self):
+        """
+        Seed the totals document from the collections if it does not exist yet.
+        Must run before the first _inc_stats: its upsert would otherwise create
+        the document with counters starting from zero.
+        """
+        if await self.stats.find_one({"_id": STATS_TOTALS_KEY}, {"_id": 1}) is None:
+            await self.rebuild_stats()
+
+    async def rebuild_stats(self):
+        """Recount the totals document from the users and files collections"""
+        totals = {"users": await self.users.count_documents({}), "files": 0, "bytes": 0}
+        cursor = self.files.aggregate([
+            {"$group": {"_id": "$category", "count": {"$sum": 1}, "bytes": {"$sum": "$file_size"}}}
+        ])
+        async for group in cursor:
+            totals[f"files_{group['_id'] or 'short'}"] = group["count"]
+            totals["files"] += group["count"]
+            totals["bytes"] += group["bytes"]
+        await self.stats.update_one({"_id": STATS_TOTALS_KEY}, {"$set": totals}, upsert=True)
+        LOGGER(__name__).info(f"Stats rebuilt: {totals['users']} users, {totals['files']} files")
+        return {"_id": STATS_TOTALS_KEY, **totals}
 
     async def get_setting(self, key):
-        setting = await self.settings.find_one({"_id": key})
-        return setting.get("value") if setting else None
+        if self._settings is None:
+            await self.load_settings()
+        return self._settings.get(key)
 
     async def set_setting(self, key, value):
         await self.settings.update_one(
@@ -62,17 +475,193 @@ class Database:
             {"$set": {"value": value}},
             upsert=True
         )
+        version = await self.settings.find_one_and_update(
+            {"_id": SETTINGS_VERSION_KEY},
+            {"$inc": {"value": 1}},
+            projection={"value": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if self._settings is None:
+            return
+        if version.get("value") == (self._settings_version or 0) + 1:
+            self._settings = {**self._settings, key: value}
+            self._settings_version = version.get("value")
+        else:
+            # Another process changed settings since we last loaded them
+            await self.load_settings()
 
     async def get_all_settings(self):
-        settings_cursor = self.settings.find({})
+        settings_cursor = self.settings.find({"_id": {"$ne": SETTINGS_VERSION_KEY}}, {"value": 1})
         settings = {}
         async for setting in settings_cursor:
             settings[setting["_id"]] = setting.get("value")
         return settings
 
+    async def load_settings(self):
+        version = await self._get_settings_version()
+        self._settings = await self.get_all_settings()
+        self._settings_version = version
+
+    async def _get_settings_version(self):
+        setting = await self.settings.find_one({"_id": SETTINGS_VERSION_KEY}, {"value": 1})
+        return setting.get("value") if setting else None
+
+    async def watch_settings(self):
+        """Keep the in-memory settings in sync with changes made by other processes"""
+        while True:
+            try:
+                await self._watch_settings_stream()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # Change streams need a replica set; fall back to version polling
+                LOGGER(__name__).info(f"Settings change stream unavailable ({e.code}), polling instead")
+                await self._poll_settings()
+            except Exception as e:
+                LOGGER(__name__).warning(f"Settings watcher error: {e}")
+                await asyncio.sleep(SETTINGS_POLL_INTERVAL)
+
+    async def _watch_settings_stream(self):
+        async with self.settings.watch(full_document="updateLookup") as stream:
+            # Catch up on anything written before the stream was opened
+            await self.load_settings()
+            async for change in stream:
+                key = change["documentKey"]["_id"]
+                if key == SETTINGS_VERSION_KEY:
+                    continue
+                if change["operationType"] == "delete":
+                    settings = dict(self._settings)
+                    settings.pop(key, None)
+                    self._settings = settings
+                elif change.get("fullDocument"):
+                    self._settings = {**self._settings, key: change["fullDocument"].get("value")}
+
+    async def _poll_settings(self):
+        while True:
+            await asyncio.sleep(SETTINGS_POLL_INTERVAL)
+            try:
+                if await self._get_settings_version() != self._settings_version:
+                    await self.load_settings()
+                    LOGGER(__name__).info("Settings reloaded")
+            except Exception as e:
+                LOGGER(__name__).warning(f"Settings poll failed: {e}")
+
+    async def get_auto_delete_time(self):
+        value = await self.get_setting("auto_delete_time")
+        return AUTO_DELETE_TIME if value is None else value
+
+    async def add_auto_delete(self, chat_id, message_ids, delete_at, bot_id=None):
+        # Message IDs are per bot chat, so entries of helper bots are keyed by bot too
+        prefix = f"{bot_id}:" if bot_id else ""
+        fields = {"bot_id": bot_id} if bot_id else {}
+        await self.auto_delete.bulk_write([
+            UpdateOne(
+                {"_id": f"{prefix}{chat_id}:{message_id}"},
+                {"$set": {"chat_id": chat_id, "message_id": message_id, "delete_at": delete_at, **fields}},
+                upsert=True
+            )
+            for message_id in message_ids
+        ], ordered=False)
+
+    async def get_due_auto_deletes(self, now, limit=1000):
+        cursor = self.auto_delete.find(
+            {"delete_at": {"$lte": now}}, {"chat_id": 1, "message_id": 1, "bot_id": 1, "attempts": 1}
+        ).sort("delete_at", 1).limit(limit).batch_size(limit)
+        return await cursor.to_list(length=limit)
+
+    async def remove_auto_deletes(self, entry_ids):
+        await self.auto_delete.delete_many({"_id": {"$in": entry_ids}})
+
+    async def retry_auto_deletes(self, entry_ids, delete_at):
+        """Move failed deletions to a later deadline and count the attempt"""
+        await self.auto_delete.update_many(
+            {"_id": {"$in": entry_ids}}, {"$set": {"delete_at": delete_at}, "$inc": {"attempts": 1}}
+        )
+
+    async def pending_auto_delete_count(self):
+        return await self.auto_delete.estimated_document_count()
+
+    async def add_helper_user(self, user_id, bot_id):
+        """Remember that user_id started helper bot bot_id, so it may message them"""
+        await self.helper_users.update_one({"_id": user_id}, {"$addToSet": {"bots": bot_id}}, upsert=True)
+        self._helper_bots.pop(user_id)
+
+    async def remove_helper_user(self, user_id, bot_id):
+        await self.helper_users.update_one({"_id": user_id}, {"$pull": {"bots": bot_id}})
+        self._helper_bots.pop(user_id)
+
+    async def get_helper_bots(self, user_ids):
+        """Map each user ID to the helper bot IDs it has started (missing = none)"""
+        result = {}
+        missing = []
+        for user_id in user_ids:
+            bots = self._helper_bots.get(user_id)
+            if bots is None:
+                missing.append(user_id)
+            elif bots:
+                result[user_id] = bots
+        if missing:
+            found = {}
+            cursor = self.helper_users.find({"_id": {"$in": missing}}, {"bots": 1}).batch_size(len(missing))
+            async for doc in cursor:
+                found[doc["_id"]] = doc.get("bots", [])
+            for user_id in missing:
+                bots = found.get(user_id, [])
+                self._helper_bots.set(user_id, bots)
+                if bots:
+                    result[user_id] = bots
+        return result
+
+    async def get_checkpoint(self, key):
+        return await self.checkpoints.find_one({"_id": key}, {"_id": 0})
+
+    async def save_checkpoint(self, key, state):
+        await self.checkpoints.update_one(
+            {"_id": key},
+            {"$set": {**state, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    async def get_conversation(self, user_id):
+        """Unexpired conversation state of an admin, or None"""
+        doc = await self.conversations.find_one(
+            {"_id": user_id, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"state": 1}
+        )
+        return doc["state"] if doc else None
+
+    async def save_conversation(self, user_id, state, ttl):
+        await self.conversations.update_one(
+            {"_id": user_id},
+            {"$set": {"state": state, "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl)}},
+            upsert=True
+        )
+
+    async def delete_conversation(self, user_id):
+        await self.conversations.delete_one({"_id": user_id})
+
+    async def get_all_channel_info(self):
+        channels = {}
+        async for channel in self.channels.find({}, {"title": 1, "invite_link": 1}):
+            channels[channel["_id"]] = {
+                "title": channel.get("title"),
+                "invite_link": channel.get("invite_link")
+            }
+        return channels
+
+    async def save_channel_info(self, channel_id, title, invite_link):
+        await self.channels.update_one(
+            {"_id": channel_id},
+            {"$set": {"title": title, "invite_link": invite_link}},
+            upsert=True
+        )
+
+    async def delete_channel_info(self, channel_id):
+        await self.channels.delete_one({"_id": channel_id})
+
     async def get_force_sub_channels(self):
         channels = await self.get_setting("force_sub_channels")
-        return channels if channels else []
+        return list(channels) if channels else []
 
     async def add_force_sub_channel(self, channel_id):
         channels = await self.get_force_sub_channels()
@@ -90,9 +679,12 @@ class Database:
             return True
         return False
 
+# Background loops run for the whole process lifetime and are not timed
+metrics.instrument_class(Database, exclude=("watch_settings", "run_flusher"))
+
+# No I/O happens here; the connection is checked by db.ping() during startup
 try:
     db = Database(DATABASE_URL, DATABASE_NAME)
-    LOGGER(__name__).info("Database Connected Successfully!")
 except Exception as e:
-    LOGGER(__name__).error(f"Database Connection Error: {e}")
+    LOGGER(__name__).error(f"Invalid DATABASE_URL: {e}")
     exit(1)
@@ -2,12 +2,41 @@ import base64
 import re
 import asyncio
 from pyrogram import filters
+from pyrogram.enums import ChatMemberStatus
 from pyrogram.errors import FloodWait, UserNotParticipant
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from config import FORCE_SUB_CHANNELS, ADMINS, FORCE_SUB_MESSAGE, LOGGER
+from config import (
+    FORCE_SUB_CHANNELS, ADMINS, FORCE_SUB_MESSAGE, LOGGER,
+    FSUB_CACHE_POSITIVE_TTL, FSUB_CACHE_NEGATIVE_TTL, FSUB_CACHE_SIZE
+)
 from database.database import db
+from core.cache import TTLCache
+from core.channels import channel_info
+from core.sender import sender
 
-async def is_subscribed(client, user_id):
+# Prefix added to a decoded start payload by the "Try Again" button
+RETRY_PREFIX = "retry:"
+
+# (user_id, channel_id) -> joined
+membership_cache = TTLCache(FSUB_CACHE_SIZE, FSUB_CACHE_POSITIVE_TTL)
+
+async def check_membership(client, channel_id, user_id):
+    """Return True/False for membership, or None if the check itself failed"""
+    try:
+        member = await client.get_chat_member(chat_id=channel_id, user_id=user_id)
+        return member.status not in (ChatMemberStatus.BANNED, ChatMemberStatus.LEFT)
+    except UserNotParticipant:
+        return False
+    except Exception as e:
+        LOGGER(__name__).error(f"Error checking subscription for channel {channel_id}: {e}")
+        return None
+
+async def is_subscribed(client, user_id, fresh=False):
+    """
+    Check the user against all force-sub channels.
+    Cached results are reused (negative ones only when fresh is False),
+    remaining channels are checked concurrently.
+    """
     db_channels = await db.get_force_sub_channels()
     all_channels = list(set(FORCE_SUB_CHANNELS + db_channels))
     
@@ -15,36 +44,54 @@ async def is_subscribed(client, user_id):
         return True, []
     
     not_joined = []
+    unchecked = []
     
     for channel_id in all_channels:
-        try:
-            member = await client.get_chat_member(chat_id=channel_id, user_id=user_id)
-            if member.status == "kicked":
-                not_joined.append(channel_id)
-        except UserNotParticipant:
+        joined = membership_cache.get((user_id, channel_id))
+        if joined is None or (fresh and not joined):
+            unchecked.append(channel_id)
+        elif not joined:
             not_joined.append(channel_id)
-        except Exception as e:
-            LOGGER(__name__).error(f"Error checking subscription for channel {channel_id}: {e}")
+    
+    results = await asyncio.gather(
+        *(check_membership(client, channel_id, user_id) for channel_id in unchecked)
+    )
+    
+    for channel_id, joined in zip(unchecked, results):
+        if joined is not None:
+            membership_cache.set(
+                (user_id, channel_id),
+                joined,
+                ttl=FSUB_CACHE_POSITIVE_TTL if joined else FSUB_CACHE_NEGATIVE_TTL
+            )
+        if not joined:
             not_joined.append(channel_id)
     
     return len(not_joined) == 0, not_joined
 
+def get_retry_link(client, message: Message):
+    """Deep link that repeats the current request with a fresh membership check"""
+    command = getattr(message, "command", None) or []
+    if len(command) > 1:
+        try:
+            string = decode(command[1])
+            if not string.startswith(RETRY_PREFIX):
+                string = f"{RETRY_PREFIX}{string}"
+            return f"https://t.me/{client.username}?start={encode(string)}"
+        except Exception:
+            pass
+    return f"https://t.me/{client.username}"
+
 async def get_invite_links(client, channel_ids):
     links = []
-    for channel_id in channel_ids:
-        try:
-            chat = await client.get_chat(channel_id)
-            invite_link = chat.invite_link
-            if not invite_link:
-                invite_link = await client.export_chat_invite_link(channel_id)
-            links.append((chat.title, invite_link))
-        except Exception as e:
-            LOGGER(__name__).error(f"Error getting invite link for {channel_id}: {e}")
+    for info in await channel_info.get_many(client, channel_ids):
+        if info:
+            links.append((info["title"], info["invite_link"]))
     return links
 
-async def handle_force_sub(client, message: Message):
+async def handle_force_sub(client, message: Message, fresh=False):
     user_id = message.from_user.id
-    subscribed, not_joined = await is_subscribed(client, user_id)
+    subscribed, not_joined = await is_subscribed(client, user_id, fresh=fresh)
     
     if subscribed:
         return True
@@ -55,7 +102,7 @@ async def handle_force_sub(client, message: Message):
     for idx, (channel_name, invite_link) in enumerate(invite_links, 1):
         buttons.append([InlineKeyboardButton(f"📢 Join {channel_name}", url=invite_link)])
     
-    buttons.append([InlineKeyboardButton("🔄 Try Again", url=f"https://t.me/{client.username}?start=start")])
+    buttons.append([InlineKeyboardButton("🔄 Try Again", url=get_retry_link(client, message))])
     
     text = FORCE_SUB_MESSAGE.format(
         first=message.from_user.first_name,
@@ -65,7 +112,8 @@ async def handle_force_sub(client, message: Message):
         id=message.from_user.id
     )
     
-    await message.reply_text(
+    await sender.send(
+        message.chat.id, message.reply_text,
         text=text,
         reply_markup=InlineKeyboardMarkup(buttons),
         disable_web_page_preview=True
@@ -84,25 +132,47 @@ def decode(base64_string):
     string_bytes = base64.urlsafe_b64decode(base64_bytes) 
     return string_bytes.decode("ascii")
 
-async def get_messages(client, message_ids):
+async def get_messages(client, message_ids, chat_id=None):
+    """Fetch messages in chunks of 200, skipping chunks that fail with non-FloodWait errors"""
+    chat_id = chat_id or client.db_channel.id
     messages = []
     total_messages = 0
-    while total_messages != len(message_ids):
+    while total_messages < len(message_ids):
         temp_ids = message_ids[total_messages:total_messages+200]
         try:
             msgs = await client.get_messages(
-                chat_id=client.db_channel.id,
+                chat_id=chat_id,
                 message_ids=temp_ids
             )
-            total_messages += len(temp_ids)
             messages.extend(msgs)
         except FloodWait as e:
             await asyncio.sleep(e.value)
+            continue
         except Exception as e:
-            LOGGER(__name__).error(e)
-            pass
+            LOGGER(__name__).error(f"Error fetching messages {temp_ids[0]}-{temp_ids[-1]}: {e}")
+        total_messages += len(temp_ids)
     return messages
 
+def get_media_info(message: Message):
+    """Media fields stored with a file so it can be re-sent by file_id (None for non-media posts)"""
+    if not message.media:
+        return None
+    media = getattr(message, message.media.value, None)
+    if not getattr(media, "file_id", None):
+        return None
+    return {
+        "media_type": message.media.value,
+        "file_id": media.file_id,
+        "file_unique_id": media.file_unique_id,
+        "file_name": getattr(media, "file_name", None),
+        "file_size": getattr(media, "file_size", None),
+        "caption": message.caption.html if message.caption else None,
+        # Album posts are delivered together as one media group
+        "media_group_id": message.media_group_id,
+        # Inline buttons can only be reproduced by copying the original post
+        "has_buttons": bool(message.reply_markup)
+    }
+
 def get_readable_time(seconds: int) -> str:
     result = ''
     (days, remainder) = divmod(seconds, 86400)
@@ -121,6 +191,13 @@ def get_readable_time(seconds: int) -> str:
     result += f'{seconds}s'
     return result
 
+def get_readable_size(size: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(size) < 1024 or unit == 'TB':
+            break
+        size /= 1024
+    return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.2f} {unit}'
+
 def is_admin_filter():
     async def func(flt, client, message: Message):
         return message.from_user.id in ADMINS
@@ -1,8 +1,15 @@
+import time
 from pyrogram import Client, filters
+from pyrogram.enums import ChatMemberStatus
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from database.database import db
-from config import ADMINS, AUTO_DELETE_TIME, LOGGER
-from helper_func import is_admin_filter, get_readable_time
+from config import ADMINS, LOGGER
+from helper_func import is_admin_filter, get_readable_time, get_readable_size
+from core.channels import channel_info
+from core.reindex import indexer
+
+# Minimum seconds between progress edits of the /reindex status message
+REINDEX_STATUS_INTERVAL = 5
 
 @Client.on_message(filters.command('settings') & filters.private & is_admin_filter())
 async def settings_command(client: Client, message: Message):
@@ -10,7 +17,7 @@ async def settings_command(client: Client, message: Message):
     
     # Get current settings
     force_channels = await db.get_force_sub_channels()
-    auto_delete_time = await db.get_setting("auto_delete_time") or AUTO_DELETE_TIME
+    auto_delete_time = await db.get_auto_delete_time()
     
     text = (
         "⚙️ **Admin Panel**\n\n"
@@ -41,11 +48,11 @@ async def manage_force_sub(client: Client, callback: CallbackQuery):
     
     if force_channels:
         text += "**Current Channels:**\n"
-        for idx, channel_id in enumerate(force_channels, 1):
-            try:
-                chat = await client.get_chat(channel_id)
-                text += f"{idx}. {chat.title} (`{channel_id}`)\n"
-            except:
+        infos = await channel_info.get_many(client, force_channels)
+        for idx, (channel_id, info) in enumerate(zip(force_channels, infos), 1):
+            if info:
+                text += f"{idx}. {info['title']} (`{channel_id}`)\n"
+            else:
                 text += f"{idx}. Channel ID: `{channel_id}`\n"
     else:
         text += "No force subscribe channels set.\n"
@@ -80,7 +87,7 @@ async def add_force_sub_channel(client: Client, message: Message):
             chat = await client.get_chat(channel_id)
             member = await client.get_chat_member(channel_id, client.me.id)
             
-            if member.status not in ["administrator", "creator"]:
+            if member.status not in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]:
                 await message.reply_text(
                     f"❌ I'm not an admin in **{chat.title}**!\n"
                     "Please make me admin first."
@@ -94,6 +101,7 @@ async def add_force_sub_channel(client: Client, message: Message):
         success = await db.add_force_sub_channel(channel_id)
         
         if success:
+            await channel_info.invalidate(channel_id)
             await message.reply_text(
                 f"✅ Added **{chat.title}** to force subscribe!\n"
                 f"Channel ID: `{channel_id}`"
@@ -125,6 +133,7 @@ async def delete_force_sub_channel(client: Client, message: Message):
         success = await db.remove_force_sub_channel(channel_id)
         
         if success:
+            await channel_info.invalidate(channel_id)
             await message.reply_text(f"✅ Removed channel `{channel_id}` from force subscribe!")
             LOGGER(__name__).info(f"Admin {message.from_user.id} removed force-sub channel: {channel_id}")
         else:
@@ -147,13 +156,13 @@ async def list_force_sub_channels(client: Client, message: Message):
     
     text = "📢 **Force Subscribe Channels:**\n\n"
     
-    for idx, channel_id in enumerate(force_channels, 1):
-        try:
-            chat = await client.get_chat(channel_id)
-            text += f"{idx}. **{chat.title}**\n"
+    infos = await channel_info.get_many(client, force_channels)
+    for idx, (channel_id, info) in enumerate(zip(force_channels, infos), 1):
+        if info:
+            text += f"{idx}. **{info['title']}**\n"
             text += f"   └ ID: `{channel_id}`\n"
-            text += f"   └ Link: {chat.invite_link or 'N/A'}\n\n"
-        except Exception as e:
+            text += f"   └ Link: {info['invite_link'] or 'N/A'}\n\n"
+        else:
             text += f"{idx}. Channel ID: `{channel_id}`\n"
             text += f"   └ Error: Unable to fetch info\n\n"
     
@@ -164,7 +173,7 @@ async def change_delete_time_callback(client: Client, callback: CallbackQuery):
     """Change auto-delete time"""
     await callback.answer()
     
-    current_time = await db.get_setting("auto_delete_time") or AUTO_DELETE_TIME
+    current_time = await db.get_auto_delete_time()
     
     text = (
         "⏰ **Change Auto-Delete Time**\n\n"
@@ -221,27 +230,109 @@ async def set_delete_time(client: Client, message: Message):
     except Exception as e:
         await message.reply_text(f"❌ Error: {str(e)}")
 
+@Client.on_message(filters.command('reindex') & filters.private & is_admin_filter())
+async def reindex_command(client: Client, message: Message):
+    """Index DB channel posts that were made while the bot was offline"""
+    
+    channels = dict(indexer.channels(client))
+    category = message.command[1].lower() if len(message.command) > 1 else None
+    if category and category not in channels:
+        await message.reply_text(
+            "❌ **Usage:** `/reindex [short|movie] [from_id]`\n\n"
+            "Without arguments every channel is scanned from the last indexed post."
+        )
+        return
+    
+    from_id = None
+    if len(message.command) > 2:
+        if not message.command[2].isdigit():
+            await message.reply_text("❌ Invalid message ID!")
+            return
+        from_id = int(message.command[2])
+    
+    selected = {category: channels[category]} if category else channels
+    if any(indexer.running(channel_id) for channel_id in selected.values()):
+        await message.reply_text("⏳ A reindex is already running, please wait.")
+        return
+    
+    status = await message.reply_text("🔎 **Reindexing...**")
+    last_edit = time.monotonic()
+    
+    async def progress(category, next_id, scanned, added):
+        nonlocal last_edit
+        if time.monotonic() - last_edit < REINDEX_STATUS_INTERVAL:
+            return
+        last_edit = time.monotonic()
+        try:
+            await status.edit_text(
+                f"🔎 **Reindexing {category.upper()}...**\n\n"
+                f"📍 Next message: {next_id}\n"
+                f"🔢 IDs scanned: {scanned}\n"
+                f"📦 Files added: {added}"
+            )
+        except Exception:
+            pass
+    
+    text = "✅ **Reindex Complete!**\n\n"
+    for name, channel_id in selected.items():
+        try:
+            scanned, added = await indexer.scan(client, name, channel_id, from_id, progress)
+            text += f"• {name.upper()}: {added} file(s) added, {scanned} IDs scanned\n"
+        except Exception as e:
+            LOGGER(__name__).error(f"Reindex of {name} channel failed: {e}")
+            text += f"• {name.upper()}: ❌ {str(e)} (progress saved, run again to resume)\n"
+    
+    await status.edit_text(text)
+    LOGGER(__name__).info(f"Admin {message.from_user.id} ran /reindex {category or 'all'}")
+
 @Client.on_callback_query(filters.regex("^view_stats$") & filters.create(lambda _, __, q: q.from_user.id in ADMINS))
 async def view_stats_callback(client: Client, callback: CallbackQuery):
     """View bot statistics"""
     await callback.answer("Loading stats...")
     
-    total_users = await db.total_users_count()
-    total_files = await db.total_files_count()
-    force_channels = await db.get_force_sub_channels()
-    
+    # Counters are maintained on every registration, ingest and deletion
+    totals, daily = await db.get_stats()
+    await callback.message.edit_text(
+        render_stats(totals, daily, await db.get_force_sub_channels()),
+        reply_markup=stats_keyboard()
+    )
+
+@Client.on_callback_query(filters.regex("^recount_stats$") & filters.create(lambda _, __, q: q.from_user.id in ADMINS))
+async def recount_stats_callback(client: Client, callback: CallbackQuery):
+    """Recompute the stat counters from the collections"""
+    await callback.answer("Recounting... this may take a while.")
+    
+    await db.rebuild_stats()
+    totals, daily = await db.get_stats()
+    await callback.message.edit_text(
+        render_stats(totals, daily, await db.get_force_sub_channels()),
+        reply_markup=stats_keyboard()
+    )
+
+def render_stats(totals, daily, force_channels):
     text = (
         "📊 **Bot Statistics**\n\n"
-        f"👥 Total Users: {total_users}\n"
-        f"📦 Total Files: {total_files}\n"
-        f"📢 Force-Sub Channels: {len(force_channels)}\n"
+        f"👥 Total Users: {totals.get('users', 0)}\n"
+        f"📦 Total Files: {totals.get('files', 0)}\n"
+        f"   • Short: {totals.get('files_short', 0)}\n"
+        f"   • Movie: {totals.get('files_movie', 0)}\n"
+        f"💾 Stored: {get_readable_size(totals.get('bytes', 0))}\n"
+        f"📢 Force-Sub Channels: {len(force_channels)}\n\n"
+        f"📈 **Last {len(daily)} Days** (new users / files):\n"
     )
+    for day, rollup in daily:
+        text += f"`{day[5:]}`  +{rollup.get('new_users', 0)} / +{rollup.get('new_files', 0)}\n"
     
-    keyboard = InlineKeyboardMarkup([
+    week_users = sum(rollup.get('new_users', 0) for _, rollup in daily)
+    week_files = sum(rollup.get('new_files', 0) for _, rollup in daily)
+    text += f"\n{len(daily)}-day total: +{week_users} users, +{week_files} files"
+    return text
+
+def stats_keyboard():
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔄 Recount", callback_data="recount_stats")],
         [InlineKeyboardButton("🔙 Back to Settings", callback_data="back_to_settings")]
     ])
-    
-    await callback.message.edit_text(text, reply_markup=keyboard)
 
 @Client.on_callback_query(filters.regex("^back_to_settings$") & filters.create(lambda _, __, q: q.from_user.id in ADMINS))
 async def back_to_settings(client: Client, callback: CallbackQuery):
@@ -249,7 +340,7 @@ async def back_to_settings(client: Client, callback: CallbackQuery):
     await callback.answer()
     
     force_channels = await db.get_force_sub_channels()
-    auto_delete_time = await db.get_setting("auto_delete_time") or AUTO_DELETE_TIME
+    auto_delete_time = await db.get_auto_delete_time()
     
     text = (
         "⚙️ **Admin Panel**\n\n"
@@ -2,7 +2,8 @@ from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import FloodWait
 from database.database import db
-from config import CHANNEL_ID, DISABLE_CHANNEL_BUTTON, LOGGER
+from core.conversations import conversations
+from config import CHANNEL_ID, MOVIE_CHANNEL_ID, BATCH_MAX_FILES, DISABLE_CHANNEL_BUTTON, LOGGER
 from helper_func import encode, is_admin_filter
 import asyncio
 
@@ -20,28 +21,65 @@ async def batch_command(client: Client, message: Message):
         "1️⃣ Forward the **first message** from SHORT database channel\n"
         "2️⃣ Forward the **last message** from SHORT database channel\n\n"
         "⚠️ Make sure both messages are from the SHORT database channel!\n"
-        "⚠️ Batch links are for SHORT category only (auto-delete)."
+        "⚠️ Batch links are for SHORT category only (auto-delete).\n\n"
+        "💡 Use /custombatch to pick individual files instead."
     )
     
     # Store user state for batch creation
-    client.batch_states = getattr(client, 'batch_states', {})
-    client.batch_states[message.from_user.id] = {'step': 1, 'first_id': None}
+    await conversations.start(message.from_user.id, 'batch', step=1, first_id=None)
 
-@Client.on_message(filters.private & filters.forwarded & is_admin_filter())
-async def handle_batch_forward(client: Client, message: Message):
-    """Handle forwarded messages for batch creation"""
+@Client.on_message(filters.command('custombatch') & filters.private & is_admin_filter())
+async def custom_batch_command(client: Client, message: Message):
+    """
+    Create batch link from hand-picked files
+    Usage: /custombatch
+    Then forward the wanted messages (in order) from one database channel and send /done
+    """
+    
+    await message.reply_text(
+        "📦 **Custom Batch Generator**\n\n"
+        "Forward the files you want, in the order they should be sent, "
+        "from **one** database channel (SHORT or MOVIE).\n\n"
+        f"Send /done when finished (maximum {BATCH_MAX_FILES} files)."
+    )
+    
+    await conversations.start(message.from_user.id, 'custombatch', channel_id=None, file_ids=[])
+
+@Client.on_message(filters.command('done') & filters.private & is_admin_filter())
+async def custom_batch_done(client: Client, message: Message):
+    """Finish a /custombatch selection"""
     
-    # Check if user is in batch creation mode
-    batch_states = getattr(client, 'batch_states', {})
     user_id = message.from_user.id
+    state = await conversations.get(user_id)
+    
+    if not state or state['flow'] != 'custombatch':
+        await message.reply_text("❌ No custom batch in progress. Start with /custombatch")
+        return
+    
+    await conversations.end(user_id)
     
-    if user_id not in batch_states:
+    # Keep only messages that are stored files, in the order they were forwarded
+    files = await db.get_files(state['file_ids'])
+    file_ids = [fid for fid in state['file_ids'] if fid in files]
+    
+    if not file_ids:
+        await message.reply_text("❌ None of the forwarded messages are stored files. Start over with /custombatch")
         return
     
-    state = batch_states[user_id]
+    await send_batch_link(client, message, state['channel_id'], file_ids)
+
+@Client.on_message(filters.private & filters.forwarded & is_admin_filter())
+async def handle_forward(client: Client, message: Message):
+    """Route forwarded messages to the admin's current /batch, /custombatch or /genlink flow"""
+    await conversations.dispatch(client, message)
+
+@conversations.route('batch')
+async def handle_batch_forward(client: Client, message: Message, state: dict):
+    """Handle forwarded messages for batch creation"""
+    user_id = message.from_user.id
     
     # Verify message is from SHORT database channel
-    if message.forward_from_chat.id != CHANNEL_ID:
+    if not message.forward_from_chat or message.forward_from_chat.id != CHANNEL_ID:
         await message.reply_text(
             "❌ This message is not from the SHORT database channel!\n"
             "Please forward messages from the correct channel."
@@ -52,6 +90,7 @@ async def handle_batch_forward(client: Client, message: Message):
         # First message received
         state['first_id'] = message.forward_from_message_id
         state['step'] = 2
+        await conversations.save(user_id, state)
         
         await message.reply_text(
             f"✅ First message ID: `{state['first_id']}`\n\n"
@@ -69,45 +108,94 @@ async def handle_batch_forward(client: Client, message: Message):
                 "❌ Last message ID must be greater than first message ID!\n"
                 "Please start over with `/batch`"
             )
-            del batch_states[user_id]
+            await conversations.end(user_id)
             return
         
-        # Check range size
-        total_files = last_id - first_id + 1
-        if total_files > 100:
+        # Resolve the files in the range once; link replies and other posts are skipped
+        file_ids = await db.get_file_ids_in_range(first_id, last_id, "short", BATCH_MAX_FILES + 1)
+        await conversations.end(user_id)
+        
+        if not file_ids:
             await message.reply_text(
-                f"❌ Batch too large! ({total_files} files)\n"
-                "Maximum batch size is 100 files.\n"
-                "Please select a smaller range."
+                f"❌ No files found between {first_id} and {last_id}!\n"
+                "Please start over with `/batch`"
             )
-            del batch_states[user_id]
             return
         
-        # Generate batch link
-        batch_string = f"{first_id}-{last_id}"
-        base64_string = encode(batch_string)
-        link = f"https://t.me/{client.username}?start={base64_string}"
-        
-        # Create reply markup
-        reply_markup = InlineKeyboardMarkup(
-            [[InlineKeyboardButton("🔗 Share Batch Link", url=f'https://t.me/share/url?url={link}')]]
-        ) if not DISABLE_CHANNEL_BUTTON else None
-        
-        # Send batch link
-        await message.reply_text(
-            f"✅ **Batch Link Created!**\n\n"
-            f"📊 Range: {first_id} to {last_id}\n"
-            f"📦 Total Files: {total_files}\n"
-            f"🔗 Link: `{link}`\n\n"
-            f"⚠️ This is a SHORT category batch (auto-delete enabled)",
-            disable_web_page_preview=True,
-            reply_markup=reply_markup
-        )
-        
-        LOGGER(__name__).info(f"Batch created by admin {user_id}: {first_id}-{last_id}")
+        # Check batch size
+        if len(file_ids) > BATCH_MAX_FILES:
+            await message.reply_text(
+                f"❌ Batch too large! (more than {BATCH_MAX_FILES} files)\n"
+                f"Maximum batch size is {BATCH_MAX_FILES} files.\n"
+                "Please select a smaller range."
+            )
+            return
         
-        # Clear state
-        del batch_states[user_id]
+        await send_batch_link(client, message, CHANNEL_ID, file_ids, f"{first_id} to {last_id}")
+
+@conversations.route('custombatch')
+async def handle_custom_batch_forward(client: Client, message: Message, state: dict):
+    """Add a forwarded database message to a /custombatch selection"""
+    
+    channel_id = message.forward_from_chat.id if message.forward_from_chat else None
+    
+    if not channel_id or channel_id not in (CHANNEL_ID, MOVIE_CHANNEL_ID):
+        await message.reply_text("❌ This message is not from a database channel!")
+        return
+    
+    if state['channel_id'] is None:
+        state['channel_id'] = channel_id
+    elif channel_id != state['channel_id']:
+        await message.reply_text("❌ All files of a batch must come from the same database channel!")
+        return
+    
+    msg_id = message.forward_from_message_id
+    if msg_id in state['file_ids']:
+        await message.reply_text("ℹ️ Already added.")
+        return
+    
+    if len(state['file_ids']) >= BATCH_MAX_FILES:
+        await message.reply_text(f"❌ Maximum {BATCH_MAX_FILES} files per batch. Send /done to create the link.")
+        return
+    
+    state['file_ids'].append(msg_id)
+    await conversations.save(message.from_user.id, state)
+    await message.reply_text(f"➕ Added ({len(state['file_ids'])} files). Forward more or send /done")
+
+async def send_batch_link(client: Client, message: Message, channel_id: int, file_ids: list, range_text=None):
+    """Store the batch manifest and reply with its link"""
+    
+    batch_id = await db.create_batch(channel_id, file_ids, message.from_user.id)
+    base64_string = encode(f"batch:{batch_id}")
+    link = f"https://t.me/{client.username}?start={base64_string}"
+    
+    # Create reply markup
+    reply_markup = InlineKeyboardMarkup(
+        [[InlineKeyboardButton("🔗 Share Batch Link", url=f'https://t.me/share/url?url={link}')]]
+    ) if not DISABLE_CHANNEL_BUTTON else None
+    
+    category_text = (
+        "⚠️ This is a SHORT category batch (auto-delete enabled)" if channel_id == CHANNEL_ID
+        else "♾ This is a MOVIE category batch (permanent)"
+    )
+    
+    text = "✅ **Batch Link Created!**\n\n"
+    if range_text:
+        text += f"📊 Range: {range_text}\n"
+    text += (
+        f"📦 Total Files: {len(file_ids)}\n"
+        f"🔗 Link: `{link}`\n\n"
+        f"{category_text}"
+    )
+    
+    # Send batch link
+    await message.reply_text(
+        text,
+        disable_web_page_preview=True,
+        reply_markup=reply_markup
+    )
+    
+    LOGGER(__name__).info(f"Batch {batch_id} created by admin {message.from_user.id}: {len(file_ids)} files from {channel_id}")
 
 @Client.on_message(filters.command('genlink') & filters.private & is_admin_filter())
 async def genlink_command(client: Client, message: Message):
@@ -125,24 +213,15 @@ async def genlink_command(client: Client, message: Message):
     )
     
     # Store user state
-    client.genlink_states = getattr(client, 'genlink_states', {})
-    client.genlink_states[message.from_user.id] = True
+    await conversations.start(message.from_user.id, 'genlink')
 
-@Client.on_message(filters.private & filters.forwarded & is_admin_filter())
-async def handle_genlink_forward(client: Client, message: Message):
+@conversations.route('genlink')
+async def handle_genlink_forward(client: Client, message: Message, state: dict):
     """Handle forwarded message for single link generation"""
-    
-    # Check if user is in genlink mode
-    genlink_states = getattr(client, 'genlink_states', {})
     user_id = message.from_user.id
     
-    if user_id not in genlink_states:
-        return
-    
-    from config import MOVIE_CHANNEL_ID
-    
     # Determine which channel
-    channel_id = message.forward_from_chat.id
+    channel_id = message.forward_from_chat.id if message.forward_from_chat else None
     
     if channel_id == CHANNEL_ID:
         category = "short"
@@ -155,7 +234,7 @@ async def handle_genlink_forward(client: Client, message: Message):
             "❌ This message is not from a recognized database channel!\n"
             "Please forward from SHORT or MOVIE database channel."
         )
-        del genlink_states[user_id]
+        await conversations.end(user_id)
         return
     
     # Get message ID
@@ -167,9 +246,9 @@ async def handle_genlink_forward(client: Client, message: Message):
     if not file_data:
         await message.reply_text(
             "⚠️ File not found in database. It may not have been processed yet.\n"
-            "Wait a few seconds and try again."
+            "Wait a few seconds and forward it again."
         )
-        del genlink_states[user_id]
+        # Keep the flow so the admin can retry once ingest catches up
         return
     
     # Generate link
@@ -194,4 +273,4 @@ async def handle_genlink_forward(client: Client, message: Message):
     LOGGER(__name__).info(f"Single link generated by admin {user_id}: {msg_id} ({category})")
     
     # Clear state
-    del genlink_states[user_id]
\ No newline at end of file
+    await conversations.end(user_id)
\ No newline at end of file
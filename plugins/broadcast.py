@@ -1,10 +1,9 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message
-from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
 from database.database import db
 from config import LOGGER
 from helper_func import is_admin_filter
-import asyncio
+from core.broadcast import broadcaster
 
 @Client.on_message(filters.command('broadcast') & filters.private & is_admin_filter())
 async def broadcast_command(client: Client, message: Message):
@@ -37,80 +36,17 @@ async def broadcast_command(client: Client, message: Message):
         "Send `/cancel` to stop."
     )
     
-    await asyncio.sleep(5)
-    
-    # Start broadcasting
-    broadcast_msg = message.reply_to_message
-    
-    status_msg = await confirm_msg.edit_text(
-        "📢 **Broadcasting...**\n\n"
-        "⏳ Please wait..."
-    )
-    
-    success = 0
-    failed = 0
-    deleted = 0
-    blocked = 0
-    
-    async for user in db.get_all_users():
-        user_id = user['_id']
-        
-        try:
-            # Copy the message to user
-            await broadcast_msg.copy(chat_id=user_id)
-            success += 1
-            
-            # Update status every 50 users
-            if (success + failed) % 50 == 0:
-                await status_msg.edit_text(
-                    f"📢 **Broadcasting...**\n\n"
-                    f"✅ Success: {success}\n"
-                    f"❌ Failed: {failed}\n"
-                    f"🚫 Blocked: {blocked}\n"
-                    f"❌ Deleted: {deleted}\n\n"
-                    f"⏳ Progress: {success + failed}/{total_users}"
-                )
-            
-            await asyncio.sleep(0.1)  # Avoid flood
-        
-        except FloodWait as e:
-            LOGGER(__name__).warning(f"FloodWait: {e.value}s")
-            await asyncio.sleep(e.value)
-            
-            # Retry
-            try:
-                await broadcast_msg.copy(chat_id=user_id)
-                success += 1
-            except:
-                failed += 1
-        
-        except InputUserDeactivated:
-            deleted += 1
-            await db.delete_user(user_id)
-        
-        except UserIsBlocked:
-            blocked += 1
-        
-        except Exception as e:
-            failed += 1
-            LOGGER(__name__).error(f"Broadcast error for {user_id}: {e}")
-    
-    # Final status
-    await status_msg.edit_text(
-        f"✅ **Broadcast Complete!**\n\n"
-        f"📊 **Statistics:**\n"
-        f"✅ Success: {success}\n"
-        f"❌ Failed: {failed}\n"
-        f"🚫 Blocked: {blocked}\n"
-        f"🗑 Deleted Accounts: {deleted}\n\n"
-        f"👥 Total: {total_users}\n"
-        f"📈 Success Rate: {(success/total_users)*100:.1f}%"
+    # Runs in the background (resumed after restarts) so this worker is freed
+    job_id = await broadcaster.start_job(
+        client,
+        "copy",
+        message.reply_to_message,
+        message.from_user.id,
+        confirm_msg,
+        delay=5
     )
     
-    LOGGER(__name__).info(
-        f"Broadcast completed by admin {message.from_user.id}: "
-        f"{success} success, {failed} failed"
-    )
+    LOGGER(__name__).info(f"Broadcast {job_id} started by admin {message.from_user.id}")
 
 @Client.on_message(filters.command('forward_broadcast') & filters.private & is_admin_filter())
 async def forward_broadcast_command(client: Client, message: Message):
@@ -138,65 +74,28 @@ async def forward_broadcast_command(client: Client, message: Message):
     status_msg = await message.reply_text(
         f"📢 **Starting Forward Broadcast...**\n\n"
         f"👥 Total users: {total_users}\n"
-        "⏳ Please wait..."
+        "⏳ Please wait...\n"
+        "Send `/cancel` to stop."
     )
     
-    success = 0
-    failed = 0
-    deleted = 0
-    blocked = 0
-    
-    forward_msg = message.reply_to_message
+    job_id = await broadcaster.start_job(
+        client,
+        "forward",
+        message.reply_to_message,
+        message.from_user.id,
+        status_msg
+    )
     
-    async for user in db.get_all_users():
-        user_id = user['_id']
-        
-        try:
-            # Forward the message
-            await forward_msg.forward(chat_id=user_id)
-            success += 1
-            
-            # Update status every 50 users
-            if (success + failed) % 50 == 0:
-                await status_msg.edit_text(
-                    f"📢 **Forward Broadcasting...**\n\n"
-                    f"✅ Success: {success}\n"
-                    f"❌ Failed: {failed}\n"
-                    f"🚫 Blocked: {blocked}\n"
-                    f"❌ Deleted: {deleted}\n\n"
-                    f"⏳ Progress: {success + failed}/{total_users}"
-                )
-            
-            await asyncio.sleep(0.1)
-        
-        except FloodWait as e:
-            await asyncio.sleep(e.value)
-            try:
-                await forward_msg.forward(chat_id=user_id)
-                success += 1
-            except:
-                failed += 1
-        
-        except InputUserDeactivated:
-            deleted += 1
-            await db.delete_user(user_id)
-        
-        except UserIsBlocked:
-            blocked += 1
-        
-        except Exception as e:
-            failed += 1
+    LOGGER(__name__).info(f"Forward broadcast {job_id} started by admin {message.from_user.id}")
+
+@Client.on_message(filters.command('cancel') & filters.private & is_admin_filter())
+async def cancel_broadcast_command(client: Client, message: Message):
+    """Cancel running broadcasts"""
     
-    # Final status
-    await status_msg.edit_text(
-        f"✅ **Forward Broadcast Complete!**\n\n"
-        f"📊 **Statistics:**\n"
-        f"✅ Success: {success}\n"
-        f"❌ Failed: {failed}\n"
-        f"🚫 Blocked: {blocked}\n"
-        f"🗑 Deleted Accounts: {deleted}\n\n"
-        f"👥 Total: {total_users}\n"
-        f"📈 Success Rate: {(success/total_users)*100:.1f}%"
-    )
+    cancelled = await broadcaster.cancel()
     
-    LOGGER(__name__).info(f"Forward broadcast by admin {message.from_user.id}: {success} success")
\ No newline at end of file
+    if cancelled:
+        await message.reply_text(f"🛑 Cancelling {cancelled} running broadcast(s)...")
+        LOGGER(__name__).info(f"Admin {message.from_user.id} cancelled {cancelled} broadcast(s)")
+    else:
+        await message.reply_text("⚠️ No broadcast is running.")
@@ -1,16 +1,55 @@
 from pyrogram import Client, filters
-from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from pyrogram.errors import FloodWait, UserNotParticipant
-from database.database import db
+from pyrogram.types import (
+    Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery,
+    InputMediaPhoto, InputMediaVideo, InputMediaDocument, InputMediaAudio
+)
+from pyrogram.errors import (
+    FileReferenceExpired, FileReferenceInvalid, FileReferenceEmpty, FileIdInvalid, MediaEmpty
+)
+from database.database import db, MEDIA_GROUP_LIMIT
 from config import (
     START_MESSAGE, START_PIC, CHANNEL_ID, MOVIE_CHANNEL_ID,
-    PROTECT_CONTENT, AUTO_DELETE_TIME, AUTO_DELETE_MSG,
-    AUTO_DEL_SUCCESS_MSG, CUSTOM_CAPTION, LOGGER
+    PROTECT_CONTENT, AUTO_DELETE_MSG, CUSTOM_CAPTION,
+    DUPLICATE_TAP_WINDOW, DUPLICATE_TAP_CACHE_SIZE, LOG_DELIVERY_RATE, LOGGER
 )
-from helper_func import decode, handle_force_sub, get_readable_time
+from helper_func import decode, handle_force_sub, get_messages, get_media_info, RETRY_PREFIX
+from core.auto_delete import auto_delete
+from core.cache import TTLCache, SingleFlight
+from core.logs import RateLimitedLog, ErrorSummary
+from core.sender import sender, BATCH
+from core.helpers import helpers
+from core.metrics import metrics
 import asyncio
+from collections import defaultdict
+
+# Messages fetched per get_messages call while delivering a batch
+BATCH_FETCH_SIZE = 25
+
+# Payload prefix of links pointing at a stored batch manifest
+BATCH_PREFIX = "batch:"
+
+# Errors meaning a stored file_id can no longer be sent and must be refreshed
+STALE_FILE_ERRORS = (FileReferenceExpired, FileReferenceInvalid, FileReferenceEmpty, FileIdInvalid, MediaEmpty)
+
+# One line per delivery would flood the log during a surge
+delivery_log = RateLimitedLog(LOGGER(__name__), LOG_DELIVERY_RATE)
+
+# (user_id, link) pairs delivered in the last DUPLICATE_TAP_WINDOW seconds
+recent_taps = TTLCache(DUPLICATE_TAP_CACHE_SIZE, DUPLICATE_TAP_WINDOW)
+
+# Concurrent requests for the same channel post share one get_messages call
+post_fetches = SingleFlight()
+
+# Media types that can be sent as part of a media group
+INPUT_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "document": InputMediaDocument,
+    "audio": InputMediaAudio,
+}
 
 @Client.on_message(filters.command('start') & filters.private)
+@metrics.timed("start_command")
 async def start_command(client: Client, message: Message):
     """Handle /start command"""
     user_id = message.from_user.id
@@ -31,17 +70,24 @@ async def start_command(client: Client, message: Message):
             # Decode to get message ID
             string = decode(base64_string)
             
-            # Check for batch (contains "-")
-            if "-" in string:
+            # "Try Again" links must re-check membership instead of using the cache
+            fresh = string.startswith(RETRY_PREFIX)
+            if fresh:
+                string = string[len(RETRY_PREFIX):]
+            
+            # Stored batch manifest, legacy "first-last" batch or single file
+            if string.startswith(BATCH_PREFIX):
+                await handle_stored_batch(client, message, string[len(BATCH_PREFIX):], fresh=fresh)
+            elif "-" in string:
                 # Batch request
-                await handle_batch_request(client, message, string)
+                await handle_batch_request(client, message, string, fresh=fresh)
             else:
                 # Single file request
-                await handle_file_request(client, message, int(string))
+                await handle_file_request(client, message, int(string), fresh=fresh)
         
         except Exception as e:
             LOGGER(__name__).error(f"Error decoding link: {e}")
-            await message.reply_text("❌ Invalid or expired link!")
+            await sender.send(message.chat.id, message.reply_text, "❌ Invalid or expired link!")
         
         return
     
@@ -55,7 +101,8 @@ async def start_command(client: Client, message: Message):
     )
     
     if START_PIC:
-        await message.reply_photo(
+        await sender.send(
+            message.chat.id, message.reply_photo,
             photo=START_PIC,
             caption=text,
             reply_markup=InlineKeyboardMarkup(
@@ -64,7 +111,8 @@ async def start_command(client: Client, message: Message):
             )
         )
     else:
-        await message.reply_text(
+        await sender.send(
+            message.chat.id, message.reply_text,
             text=text,
             disable_web_page_preview=True,
             reply_markup=InlineKeyboardMarkup(
@@ -73,150 +121,440 @@ async def start_command(client: Client, message: Message):
             )
         )
 
-async def handle_file_request(client: Client, message: Message, file_id: int):
+@metrics.timed("handle_file_request")
+async def handle_file_request(client: Client, message: Message, file_id: int, fresh=False):
     """Handle single file request"""
     user_id = message.from_user.id
     
     # Check force subscribe
-    subscribed = await handle_force_sub(client, message)
+    subscribed = await handle_force_sub(client, message, fresh=fresh)
     if not subscribed:
         return
     
+    if not first_tap(user_id, ("file", file_id)):
+        return
+    
+    # A tap only counts once the file is out, so a failed request can be retried at once
+    delivered = False
+    try:
+        delivered = await send_file(client, message, file_id)
+    finally:
+        if not delivered:
+            forget_tap(user_id, ("file", file_id))
+
+async def send_file(client: Client, message: Message, file_id: int):
+    """Deliver one stored file (or its album); True once it was sent"""
+    user_id = message.from_user.id
+    
     # Get file from database
     file_data = await db.get_file(file_id)
     
     if not file_data:
-        await message.reply_text("❌ File not found or has been deleted!")
-        return
+        await sender.send(message.chat.id, message.reply_text, "❌ File not found or has been deleted!")
+        return False
     
-    # Determine which channel to get file from
     category = file_data.get("category", "short")
-    channel_id = MOVIE_CHANNEL_ID if category == "movie" else CHANNEL_ID
     
     try:
-        # Get the message from database channel
-        msg = await client.get_messages(chat_id=channel_id, message_ids=file_id)
-        
-        # Prepare caption
-        caption = CUSTOM_CAPTION.format(
-            filename=getattr(msg.document, "file_name", ""),
-            previouscaption=msg.caption.html if msg.caption else "",
-            file_size=getattr(msg.document, "file_size", ""),
-        ) if CUSTOM_CAPTION and msg.document else (msg.caption.html if msg.caption else "")
-        
         # Check if auto-delete is enabled for this category
-        auto_delete_enabled = (category == "short" and AUTO_DELETE_TIME)
+        delete_time = await db.get_auto_delete_time()
+        auto_delete_enabled = (category == "short" and delete_time)
+        warning = AUTO_DELETE_MSG.format(time=delete_time) if auto_delete_enabled else None
         
-        # Add auto-delete warning to caption
-        if auto_delete_enabled:
-            delete_time = get_readable_time(AUTO_DELETE_TIME)
-            warning = AUTO_DELETE_MSG.format(time=AUTO_DELETE_TIME)
-            caption = f"{caption}\n\n{warning}" if caption else warning
+        bot_ids = (await helpers.user_bots([user_id])).get(user_id, [])
         
-        # Copy the message to user
-        sent_message = await msg.copy(
-            chat_id=user_id,
-            caption=caption,
-            protect_content=PROTECT_CONTENT,
-            reply_markup=msg.reply_markup
+        # A file posted as part of an album brings the whole album along
+        group = await db.get_media_group(file_data)
+        if groupable(group):
+            bot_id, sent_messages = await deliver_group(client, user_id, group, warning, bot_ids)
+        else:
+            bot_id, sent_message = await deliver(client, user_id, file_data, warning, bot_ids)
+            sent_messages = [sent_message]
+        
+        delivery_log.info(
+            f"File {file_id} sent to user {user_id} (category: {category})"
+            + (f" with {len(sent_messages) - 1} album file(s)" if len(sent_messages) > 1 else "")
+            + (f" via helper {bot_id}" if bot_id else "")
         )
         
-        LOGGER(__name__).info(f"File {file_id} sent to user {user_id} (category: {category})")
+        # The file is in the helper's chat; answer the tap here too
+        if bot_id:
+            await send_helper_notice(message, bot_id, len(sent_messages))
         
-        # Schedule auto-delete if enabled
+        # Schedule auto-delete if enabled (a helper's messages are deleted by that helper)
         if auto_delete_enabled:
-            asyncio.create_task(delete_file_after_time(client, sent_message, user_id))
+            await auto_delete.schedule(user_id, [m.id for m in sent_messages], delete_time, bot_id)
+        return True
     
-    except FloodWait as e:
-        await asyncio.sleep(e.value)
-        await handle_file_request(client, message, file_id)
     except Exception as e:
         LOGGER(__name__).error(f"Error sending file: {e}")
-        await message.reply_text("❌ Error retrieving file. Please try again later.")
+        await sender.send(message.chat.id, message.reply_text, "❌ Error retrieving file. Please try again later.")
+        return False
 
-async def handle_batch_request(client: Client, message: Message, batch_string: str):
-    """Handle batch file request"""
-    user_id = message.from_user.id
+def first_tap(user_id, link):
+    """False when the user already got this link within DUPLICATE_TAP_WINDOW seconds"""
+    key = (user_id, link)
+    if key in recent_taps:
+        delivery_log.info(f"Ignoring repeated tap by {user_id} on {link}")
+        return False
+    recent_taps.set(key, True)
+    return True
+
+def forget_tap(user_id, link):
+    """Let the user retry a link whose delivery failed"""
+    recent_taps.pop((user_id, link))
+
+async def fetch_posts(bot: Client, channel_id: int, message_ids):
+    """get_messages shared by concurrent requests for the same post(s) through the same bot"""
+    key = (bot.name, channel_id, message_ids if isinstance(message_ids, int) else tuple(message_ids))
+    return await post_fetches.do(key, bot.get_messages, chat_id=channel_id, message_ids=message_ids)
+
+def render_caption(media, warning=None):
+    """Build the delivery caption from stored media fields"""
+    caption = media.get("caption") or ""
+    if CUSTOM_CAPTION and media.get("media_type") == "document":
+        caption = CUSTOM_CAPTION.format(
+            filename=media.get("file_name") or "",
+            previouscaption=caption,
+            file_size=media.get("file_size") or "",
+        )
+    if warning:
+        caption = f"{caption}\n\n{warning}" if caption else warning
+    return caption
+
+async def deliver_file(client: Client, user_id: int, file_data: dict, warning=None, msg=None, channel_id=None):
+    """
+    Send a stored file to a user.
+    Uses the stored file_id (one API call); falls back to fetching and copying
+    the channel post, refreshing the stored media when Telegram rejects it.
+    """
+    if msg is None and file_data.get("file_id") and not file_data.get("has_buttons"):
+        try:
+            return await sender.send(
+                user_id,
+                client.send_cached_media,
+                user_id,
+                file_data["file_id"],
+                caption=render_caption(file_data, warning),
+                protect_content=PROTECT_CONTENT
+            )
+        except STALE_FILE_ERRORS as e:
+            LOGGER(__name__).warning(f"Stored file_id for {file_data['_id']} is stale ({e}), refreshing")
+    
+    if msg is None:
+        if channel_id is None:
+            channel_id = MOVIE_CHANNEL_ID if file_data.get("category") == "movie" else CHANNEL_ID
+        msg = await fetch_posts(client, channel_id, file_data["_id"])
+    
+    media = get_media_info(msg)
+    if media and media["file_id"] != file_data.get("file_id"):
+        await db.update_file_media(file_data["_id"], media)
+    
+    return await sender.copy(
+        msg,
+        user_id,
+        caption=render_caption(media or {}, warning),
+        protect_content=PROTECT_CONTENT,
+        reply_markup=msg.reply_markup
+    )
+
+async def deliver(client: Client, user_id: int, file_data: dict, warning=None, bot_ids=(), msg=None, channel_id=None):
+    """
+    Send a stored file through the least busy bot: the main bot or one of
+    the helper bots the user has started.
+    Returns (helper bot ID or None for the main bot, sent message).
+    """
+    if channel_id is None:
+        channel_id = MOVIE_CHANNEL_ID if file_data.get("category") == "movie" else CHANNEL_ID
+    
+    async def via_helper(bot: Client):
+        # file_ids only work for the bot that received them; helpers copy the channel post
+        post = await fetch_posts(bot, channel_id, file_data["_id"])
+        return await copy_post(post, user_id, warning)
+    
+    return await helpers.send(
+        user_id,
+        bot_ids,
+        via_helper,
+        lambda: deliver_file(client, user_id, file_data, warning, msg=msg, channel_id=channel_id)
+    )
+
+async def copy_post(post: Message, user_id: int, warning=None):
+    return await post.copy(
+        user_id,
+        caption=render_caption(get_media_info(post) or {}, warning),
+        protect_content=PROTECT_CONTENT,
+        reply_markup=post.reply_markup
+    )
+
+def album_member(file):
+    return bool(file.get("media_group_id")) and file.get("media_type") in INPUT_MEDIA and not file.get("has_buttons")
+
+def groupable(files):
+    """True when the files can go out as one media group"""
+    return 1 < len(files) <= MEDIA_GROUP_LIMIT and all(map(album_member, files))
+
+def group_files(file_ids, files):
+    """Split file IDs into delivery units: runs of one album (up to 10 files) or single files"""
+    units = []
+    for fid in file_ids:
+        file = files[fid]
+        last = units[-1] if units else None
+        if (last and len(last) < MEDIA_GROUP_LIMIT and album_member(file) and album_member(files[last[-1]])
+                and files[last[-1]]["media_group_id"] == file["media_group_id"]):
+            last.append(fid)
+        else:
+            units.append([fid])
+    return units
+
+def album(medias, warning=None):
+    """InputMedia list for send_media_group; the warning goes under the last item only"""
+    return [
+        INPUT_MEDIA[media["media_type"]](
+            media["file_id"],
+            caption=render_caption(media, warning if i == len(medias) - 1 else None)
+        )
+        for i, media in enumerate(medias)
+    ]
+
+async def deliver_group(client: Client, user_id: int, files: list, warning=None, bot_ids=(), channel_id=None):
+    """
+    Send the files of an album with one send_media_group call instead of one
+    send per file. Stored file_ids are used by the main bot; helpers (and the
+    main bot when a file_id is stale) send the media of the fetched posts.
+    If fewer than two of those posts are left, they go out one by one.
+    Returns (helper bot ID or None for the main bot, sent messages).
+    """
+    if channel_id is None:
+        channel_id = MOVIE_CHANNEL_ID if files[0].get("category") == "movie" else CHANNEL_ID
+    message_ids = [f["_id"] for f in files]
+    
+    async def fetch_album(bot: Client):
+        # (post, media) of the posts that still exist
+        posts = await fetch_posts(bot, channel_id, message_ids)
+        pairs = [(post, get_media_info(post)) for post in posts if not post.empty]
+        if not pairs:
+            raise ValueError(f"Album {message_ids} no longer exists")
+        return [(post, media) for post, media in pairs if media]
+    
+    async def via_helper(bot: Client):
+        posts = await fetch_album(bot)
+        if len(posts) < 2:
+            # send_media_group rejects fewer than two items
+            return [await copy_post(post, user_id, warning) for post, _ in posts]
+        return await bot.send_media_group(
+            user_id, album([media for _, media in posts], warning), protect_content=PROTECT_CONTENT
+        )
+    
+    async def via_main():
+        if all(f.get("file_id") for f in files):
+            try:
+                return await sender.send(
+                    user_id, client.send_media_group, user_id, album(files, warning),
+                    protect_content=PROTECT_CONTENT, cost=len(files)
+                )
+            except STALE_FILE_ERRORS as e:
+                LOGGER(__name__).warning(f"Stored file_ids of album {message_ids} are stale ({e}), refreshing")
+        
+        posts = await fetch_album(client)
+        by_id = {f["_id"]: f for f in files}
+        if len(posts) < 2:
+            return [
+                await deliver_file(client, user_id, by_id[post.id], warning, msg=post, channel_id=channel_id)
+                for post, _ in posts
+            ]
+        for post, media in posts:
+            file = by_id.get(post.id)
+            if file and media["file_id"] != file.get("file_id"):
+                await db.update_file_media(file["_id"], media)
+        return await sender.send(
+            user_id, client.send_media_group, user_id, album([media for _, media in posts], warning),
+            protect_content=PROTECT_CONTENT, cost=len(posts)
+        )
+    
+    return await helpers.send(user_id, bot_ids, via_helper, via_main, cost=len(files))
+
+@metrics.timed("handle_stored_batch")
+async def handle_stored_batch(client: Client, message: Message, batch_id: str, fresh=False):
+    """Handle batch links pointing at a stored manifest"""
     
     # Check force subscribe
-    subscribed = await handle_force_sub(client, message)
+    subscribed = await handle_force_sub(client, message, fresh=fresh)
     if not subscribed:
         return
     
+    if not first_tap(message.from_user.id, ("batch", batch_id)):
+        return
+    
+    delivered = False
     try:
-        # Parse batch string (format: "first_id-last_id")
-        first_id, last_id = map(int, batch_string.split("-"))
+        batch = await db.get_batch(batch_id)
+        if not batch:
+            await sender.send(message.chat.id, message.reply_text, "❌ Batch not found or has been deleted!")
+            return
         
-        # Limit batch size
-        if (last_id - first_id) > 100:
-            await message.reply_text("❌ Batch size too large! Maximum 100 files at once.")
+        # File IDs were resolved when the batch was created; records come from the file cache
+        files = await db.get_files(batch["file_ids"])
+        file_ids = [fid for fid in batch["file_ids"] if fid in files]
+        delivered = await send_batch(client, message, file_ids, files, batch["channel_id"])
+    finally:
+        if not delivered:
+            forget_tap(message.from_user.id, ("batch", batch_id))
+
+@metrics.timed("handle_batch_request")
+async def handle_batch_request(client: Client, message: Message, batch_string: str, fresh=False):
+    """Handle legacy "first-last" batch links"""
+    
+    # Check force subscribe
+    subscribed = await handle_force_sub(client, message, fresh=fresh)
+    if not subscribed:
+        return
+    
+    if not first_tap(message.from_user.id, ("range", batch_string)):
+        return
+    
+    delivered = False
+    try:
+        try:
+            # Parse batch string (format: "first_id-last_id")
+            first_id, last_id = map(int, batch_string.split("-"))
+            
+            # Limit batch size
+            if (last_id - first_id) > 100:
+                await sender.send(message.chat.id, message.reply_text, "❌ Batch size too large! Maximum 100 files at once.")
+                return
+            
+            # Resolve which IDs in the range are real files with a single query
+            files = await db.get_files(range(first_id, last_id + 1))
+        
+        except Exception as e:
+            LOGGER(__name__).error(f"Error in batch request: {e}")
+            await sender.send(message.chat.id, message.reply_text, "❌ Error processing batch request!")
             return
         
-        await message.reply_text("📦 Sending batch files... Please wait.")
+        # Batch is always from SHORT channel
+        delivered = await send_batch(client, message, sorted(files), files, CHANNEL_ID)
+    finally:
+        if not delivered:
+            forget_tap(message.from_user.id, ("range", batch_string))
+
+async def send_batch(client: Client, message: Message, file_ids: list, files: dict, channel_id: int):
+    """Deliver the given files (in order) from a database channel; True if all of them went out"""
+    # Batch items give way to single-file requests when the send budget is contended
+    with sender.lane(BATCH):
+        return await deliver_batch(client, message, file_ids, files, channel_id)
+
+async def deliver_batch(client: Client, message: Message, file_ids: list, files: dict, channel_id: int):
+    user_id = message.from_user.id
+    errors = ErrorSummary(LOGGER(__name__), f"Batch for user {user_id}")
+    
+    try:
+        if not file_ids:
+            await sender.send(message.chat.id, message.reply_text, "❌ No files found for this link!")
+            return False
+        
+        bot_ids = (await helpers.user_bots([user_id])).get(user_id, [])
+        await sender.send(message.chat.id, message.reply_text, **batch_notice(bot_ids))
+        
+        delete_time = await db.get_auto_delete_time()
         
-        # Send all files in batch
-        for msg_id in range(first_id, last_id + 1):
+        # Files stored with metadata are sent by file_id; only older records need
+        # their posts fetched, and the next chunk is prefetched while sending.
+        # Runs of album files are sent as one media group each.
+        units = group_files(file_ids, files)
+        chunks = asyncio.Queue(maxsize=1)
+        
+        async def fetch_chunks():
             try:
-                # Get file from database
-                file_data = await db.get_file(msg_id)
-                
-                if not file_data:
-                    continue
-                
-                # Get category (batch is always from SHORT channel)
-                category = file_data.get("category", "short")
-                channel_id = CHANNEL_ID  # Batch is always short
-                
-                # Get message
-                msg = await client.get_messages(chat_id=channel_id, message_ids=msg_id)
-                
-                # Prepare caption with auto-delete warning
-                caption = msg.caption.html if msg.caption else ""
-                if AUTO_DELETE_TIME and category == "short":
-                    warning = AUTO_DELETE_MSG.format(time=AUTO_DELETE_TIME)
-                    caption = f"{caption}\n\n{warning}" if caption else warning
-                
-                # Send file
-                sent_message = await msg.copy(
-                    chat_id=user_id,
-                    caption=caption,
-                    protect_content=PROTECT_CONTENT
-                )
+                for i in range(0, len(units), BATCH_FETCH_SIZE):
+                    chunk = units[i:i + BATCH_FETCH_SIZE]
+                    missing = [fid for unit in chunk for fid in unit if not files[fid].get("file_id")]
+                    messages = await get_messages(client, missing, chat_id=channel_id) if missing else []
+                    await chunks.put((chunk, {msg.id: msg for msg in messages if not msg.empty}))
+            except Exception as e:
+                errors.add(e, "fetching files")
+            # Skipped when cancelled: nobody is left to drain the queue then
+            await chunks.put(None)
+        
+        fetcher = asyncio.create_task(fetch_chunks())
+        
+        try:
+            while (item := await chunks.get()) is not None:
+                chunk, messages = item
+                sent_ids = defaultdict(list)
                 
-                # Schedule auto-delete if enabled
-                if AUTO_DELETE_TIME and category == "short":
-                    asyncio.create_task(delete_file_after_time(client, sent_message, user_id))
+                for unit in chunk:
+                    file_data = files[unit[0]]
+                    if not file_data.get("file_id") and unit[0] not in messages:
+                        continue
+                    
+                    try:
+                        category = file_data.get("category", "short")
+                        auto_delete_enabled = (delete_time and category == "short")
+                        warning = AUTO_DELETE_MSG.format(time=delete_time) if auto_delete_enabled else None
+                        
+                        # Send file or album (paced by the send scheduler of whichever bot delivers it)
+                        if len(unit) > 1:
+                            bot_id, sent_messages = await deliver_group(
+                                client, user_id, [files[fid] for fid in unit], warning, bot_ids, channel_id=channel_id
+                            )
+                        else:
+                            bot_id, sent_message = await deliver(
+                                client, user_id, file_data, warning, bot_ids,
+                                msg=messages.get(unit[0]), channel_id=channel_id
+                            )
+                            sent_messages = [sent_message]
+                        
+                        if auto_delete_enabled:
+                            sent_ids[bot_id].extend(m.id for m in sent_messages)
+                    
+                    except Exception as e:
+                        errors.add(e, f"file(s) {unit}")
                 
-                await asyncio.sleep(1)  # Avoid flood
-            
-            except Exception as e:
-                LOGGER(__name__).error(f"Error in batch file {msg_id}: {e}")
-                continue
+                # Schedule auto-delete once per chunk and sending bot
+                for bot_id, ids in sent_ids.items():
+                    await auto_delete.schedule(user_id, ids, delete_time, bot_id)
+        finally:
+            fetcher.cancel()
+            await asyncio.gather(fetcher, return_exceptions=True)
         
-        await message.reply_text("✅ All available files sent!")
+        await sender.send(message.chat.id, message.reply_text, "✅ All available files sent!")
+        return not errors.counts
         
     except Exception as e:
         LOGGER(__name__).error(f"Error in batch request: {e}")
-        await message.reply_text("❌ Error processing batch request!")
+        await sender.send(message.chat.id, message.reply_text, "❌ Error processing batch request!")
+        return False
+    finally:
+        errors.flush()
 
-async def delete_file_after_time(client: Client, message: Message, user_id: int):
-    """Delete file after specified time"""
-    try:
-        await asyncio.sleep(AUTO_DELETE_TIME)
-        
-        # Delete the message
-        await client.delete_messages(chat_id=user_id, message_ids=message.id)
-        
-        # Send success message
-        await client.send_message(
-            chat_id=user_id,
-            text=AUTO_DEL_SUCCESS_MSG
-        )
-        
-        LOGGER(__name__).info(f"File auto-deleted for user {user_id}")
+def batch_notice(bot_ids):
+    """Batch start message; names the helpers that may deliver, or offers to link one"""
+    linked = [helpers.bots[bot_id] for bot_id in bot_ids if bot_id in helpers.bots]
+    if linked:
+        names = ", ".join(f"@{helper.username}" for helper in linked)
+        return {"text": f"📦 Sending batch files... Please wait.\nSome may arrive from {names} when I'm busy."}
+    
+    if helpers.enabled:
+        buttons = [
+            [InlineKeyboardButton(f"⚡ Faster delivery: @{helper.username}", url=f"https://t.me/{helper.username}?start=link")]
+            for helper in helpers.bots.values()
+        ]
+        return {"text": "📦 Sending batch files... Please wait.", "reply_markup": InlineKeyboardMarkup(buttons)}
     
+    return {"text": "📦 Sending batch files... Please wait."}
+
+async def send_helper_notice(message: Message, bot_id: int, count=1):
+    """Tell the user which helper bot delivered a single file (or album)"""
+    helper = helpers.get(bot_id)
+    if helper is None:
+        return
+    what = "Your file was" if count == 1 else f"Your {count} files were"
+    try:
+        await sender.send(message.chat.id, message.reply_text, f"📨 {what} sent by @{helper.username} because I'm busy.")
     except Exception as e:
-        LOGGER(__name__).error(f"Error auto-deleting file: {e}")
+        # The file itself went out; a missing notice is not worth an error reply
+        delivery_log.warning(f"Helper notice to {message.chat.id} failed: {e}")
 
 @Client.on_callback_query(filters.regex("^(about|help)$"))
 async def callback_handler(client: Client, callback: CallbackQuery):